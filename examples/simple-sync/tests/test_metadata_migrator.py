@@ -0,0 +1,73 @@
+from sqlalchemy import (
+    Column,
+    Enum,
+    ForeignKey,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    inspect,
+)
+from sqlalchemy.schema import CreateSchema
+
+from elefast import DatabaseServer
+from elefast.sync import MetadataMigrator
+
+metadata = MetaData()
+Table(
+    "users",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("name", String(100), nullable=False),
+    Column("mood", Enum("happy", "sad", name="mood")),
+    Index("ix_users_name", "name"),
+    schema="app",
+)
+Table(
+    "posts",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", ForeignKey("app.users.id")),
+    Column("title", String(200), server_default="untitled"),
+)
+
+
+def describe(connection) -> dict:
+    inspector = inspect(connection)
+    description = {}
+    for schema in ("app", "public"):
+        for table in inspector.get_table_names(schema):
+            description[schema, table] = (
+                [
+                    (column["name"], str(column["type"]), column["nullable"])
+                    for column in inspector.get_columns(table, schema)
+                ],
+                sorted(index["name"] for index in inspector.get_indexes(table, schema)),
+                [
+                    (fk["referred_schema"], fk["referred_table"])
+                    for fk in inspector.get_foreign_keys(table, schema)
+                ],
+            )
+    description["enums"] = sorted(
+        enum["name"] for enum in inspector.get_enums(schema="*")
+    )
+    return description
+
+
+def test_script_matches_create_all(db_server: DatabaseServer):
+    """Test the compiled script creates the same schema as metadata.create_all()."""
+    with (
+        db_server.create_database() as migrated,
+        db_server.create_database() as created,
+    ):
+        with migrated.engine.begin() as connection:
+            MetadataMigrator(metadata).migrate(connection)
+            actual = describe(connection)
+        with created.engine.begin() as connection:
+            connection.execute(CreateSchema("app"))
+            metadata.create_all(connection)
+            expected = describe(connection)
+
+    assert actual == expected
+    assert ("app", "users") in actual
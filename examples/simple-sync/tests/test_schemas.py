@@ -0,0 +1,36 @@
+import pytest
+from sqlalchemy import Column, Integer, MetaData, Table, inspect, text
+
+from elefast import DatabaseServer
+from elefast.extras import docker
+from elefast.sync import MetadataMigrator
+
+metadata = MetaData()
+Table("items", metadata, Column("id", Integer, primary_key=True))
+
+
+@pytest.fixture(scope="module")
+def schema_server():
+    server = DatabaseServer(
+        docker.postgres("psycopg2"),
+        schema=MetadataMigrator(metadata),
+        isolation="schema",
+    )
+    yield server
+    server.close()
+
+
+def test_migrates_into_two_schemas(schema_server: DatabaseServer):
+    """Test that each schema gets its own tables and that writes stay in their schema."""
+    with (
+        schema_server.create_database() as first,
+        schema_server.create_database() as second,
+    ):
+        with first.engine.begin() as connection:
+            connection.execute(text("INSERT INTO items (id) VALUES (1)"))
+
+        for database, expected in ((first, 1), (second, 0)):
+            with database.engine.connect() as connection:
+                assert inspect(connection).get_table_names(database.schema) == ["items"]
+                count = connection.execute(text("SELECT count(*) FROM items"))
+                assert count.scalar_one() == expected
@@ -1,27 +1,44 @@
 from elefast.asyncio import (
     AsyncDatabase,
+    AsyncDatabaseSchema,
     AsyncDatabaseServer,
     AsyncMetadataMigrator,
     AsyncMigrator,
+    AsyncReadOnlyDatabase,
+    AsyncTransactionalDatabase,
     CanBeTurnedIntoAsyncEngine,
 )
+from elefast.cloning import CloneStrategy, FileCopyClone, TemplateClone, WalLogClone
 from elefast.sync import (
     CanBeTurnedIntoEngine,
     Database,
+    DatabaseSchema,
     DatabaseServer,
     MetadataMigrator,
     Migrator,
+    ReadOnlyDatabase,
+    TransactionalDatabase,
 )
 
 __all__ = [
     "AsyncDatabase",
+    "AsyncDatabaseSchema",
     "AsyncDatabaseServer",
     "AsyncMetadataMigrator",
     "AsyncMigrator",
+    "AsyncReadOnlyDatabase",
+    "AsyncTransactionalDatabase",
     "CanBeTurnedIntoAsyncEngine",
     "CanBeTurnedIntoEngine",
+    "CloneStrategy",
     "Database",
+    "DatabaseSchema",
     "DatabaseServer",
+    "FileCopyClone",
     "MetadataMigrator",
     "Migrator",
+    "ReadOnlyDatabase",
+    "TemplateClone",
+    "TransactionalDatabase",
+    "WalLogClone",
 ]
@@ -1,26 +1,71 @@
 from __future__ import annotations
 
 import time
-from asyncio import sleep
-from collections.abc import Callable
-from contextlib import AbstractAsyncContextManager
-from typing import Protocol, Self, TypeAlias
+from asyncio import (
+    CancelledError,
+    Lock,
+    Semaphore,
+    Task,
+    TaskGroup,
+    create_task,
+    get_running_loop,
+    sleep,
+)
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable, Mapping
+from contextlib import AbstractAsyncContextManager, asynccontextmanager, suppress
+from functools import partial
+from itertools import count
+from types import MappingProxyType
+from typing import Any, Literal, Protocol, Self, TypeAlias
 from uuid import uuid4
 
-from sqlalchemy import URL, MetaData, NullPool, text
+from sqlalchemy import URL, Connection, MetaData, NullPool, text
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import (
     AsyncConnection,
     AsyncEngine,
     AsyncSession,
+    AsyncTransaction,
     async_sessionmaker,
     create_async_engine,
 )
-from sqlalchemy.schema import CreateSchema
 
+from elefast.cloning import CloneStrategy, TemplateClone, template_in_use
+from elefast.engines import derive_engine
 from elefast.errors import DatabaseNotReadyError
+from elefast.reset import ResetPlan, install_write_tracking, written_tuples
+from elefast.schemas import (
+    RecordedStatement,
+    pin_search_path,
+    record_statements,
+    replay_statements,
+    search_path,
+)
+from elefast.templates import (
+    CANDIDATES_QUERY,
+    Fingerprinted,
+    Upgradable,
+    lock_key,
+    metadata_fingerprint,
+    migrate_metadata,
+    revision_comment_statement,
+    template_name,
+    upgradable_template,
+    xdist_template_name,
+    xdist_worker_index,
+)
 
 CanBeTurnedIntoAsyncEngine: TypeAlias = "AsyncEngine | URL | str"
 
+_TRANSACTIONAL_SESSIONMAKER = partial(
+    async_sessionmaker, join_transaction_mode="create_savepoint"
+)
+"""Creates sessions that join the outer transaction of an `AsyncTransactionalDatabase` via savepoints."""
+
+_DEFAULT_STRATEGY: CloneStrategy = TemplateClone()
+"""The clone strategy used unless one is passed explicitly. It is stateless, so sharing it is safe."""
+
 
 class AsyncMigrator(Protocol):
     async def migrate_async(self, connection: AsyncConnection) -> None:
@@ -28,19 +73,21 @@ class AsyncMigrator(Protocol):
 
 
 class AsyncMetadataMigrator(AsyncMigrator):
-    def __init__(self, metadata: MetaData) -> None:
+    def __init__(self, metadata: MetaData, drop_existing: bool = False) -> None:
         self._metadata = metadata
+        self._drop_existing = drop_existing
+        self._scripts: dict[str, list[str]] = {}
 
     async def migrate_async(self, connection: AsyncConnection) -> None:
-        schemas = {
-            table.schema
-            for table in self._metadata.tables.values()
-            if table.schema is not None and table.schema != "public"
-        }
-        for schema in schemas:
-            await connection.execute(CreateSchema(schema, if_not_exists=True))
-        await connection.run_sync(self._metadata.drop_all)
-        await connection.run_sync(self._metadata.create_all)
+        await connection.run_sync(self._migrate)
+
+    def _migrate(self, connection: Connection) -> None:
+        migrate_metadata(
+            connection, self._metadata, self._scripts, drop_existing=self._drop_existing
+        )
+
+    def fingerprint(self) -> str:
+        return metadata_fingerprint(self._metadata)
 
 
 class AsyncDatabase(AbstractAsyncContextManager):
@@ -73,17 +120,240 @@ class AsyncDatabase(AbstractAsyncContextManager):
         await self.engine.dispose()
         await self.server.drop_database(self.name)
 
+    async def snapshot(self) -> str:
+        """
+        Turns the current state of the database into a new template and returns its name.
+
+        See [`Database.snapshot()`][Database.snapshot] for details.
+        """
+        await self.engine.dispose()
+        return await self.server.snapshot_database(self.name)
+
+    async def reset(self) -> None:
+        """
+        Returns the database to the state of the template, without dropping and re-creating it.
+
+        See [`Database.reset()`][Database.reset] for details.
+        """
+        plan = await self.server.reset_plan()
+        async with self.engine.begin() as connection:
+            await connection.run_sync(plan.apply)
+
+    def transactional(
+        self,
+        sessionmaker_factory: Callable[
+            [AsyncConnection], Callable[[], AsyncSession]
+        ] = _TRANSACTIONAL_SESSIONMAKER,
+    ) -> AsyncTransactionalDatabase:
+        """
+        Opens a connection whose changes are rolled back once you are done with it.
+
+        See [`TransactionalDatabase`][TransactionalDatabase] for details.
+        """
+        return AsyncTransactionalDatabase(
+            self, sessionmaker_factory=sessionmaker_factory
+        )
+
+    def session(self) -> AsyncSession:
+        return self.sessionmaker()
+
+
+class AsyncTransactionalDatabase(AbstractAsyncContextManager):
+    """
+    A connection to an [`AsyncDatabase`][AsyncDatabase] that runs everything in a transaction, which is rolled back on
+    exit.
+
+    See [`TransactionalDatabase`][TransactionalDatabase] for details.
+    """
+
+    connection: AsyncConnection
+    """The connection holding the outer transaction. Use `begin_nested()` instead of `commit()` on it."""
+
+    def __init__(
+        self,
+        database: AsyncDatabase,
+        sessionmaker_factory: Callable[
+            [AsyncConnection], Callable[[], AsyncSession]
+        ] = _TRANSACTIONAL_SESSIONMAKER,
+    ) -> None:
+        self.database = database
+        self._sessionmaker_factory = sessionmaker_factory
+        self._transaction: AsyncTransaction | None = None
+
+    async def __aenter__(self) -> Self:
+        self.connection = await self.database.engine.connect()
+        self._transaction = await self.connection.begin()
+        self.sessionmaker = self._sessionmaker_factory(self.connection)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.rollback()
+
+    @property
+    def url(self) -> URL:
+        return self.database.url
+
+    @property
+    def name(self) -> str:
+        return self.database.name
+
+    async def rollback(self) -> None:
+        if self._transaction is None:
+            return
+        if self._transaction.is_active:
+            await self._transaction.rollback()
+        await self.connection.close()
+        self._transaction = None
+
     def session(self) -> AsyncSession:
         return self.sessionmaker()
 
 
+class AsyncDatabaseSchema(AsyncDatabase):
+    """
+    A schema inside a database that is shared with other tests.
+
+    See [`DatabaseSchema`][DatabaseSchema] for details.
+    """
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        server: AsyncDatabaseServer,
+        schema: str,
+        sessionmaker_factory: Callable[
+            [AsyncEngine], Callable[[], AsyncSession]
+        ] = async_sessionmaker,
+    ) -> None:
+        super().__init__(engine, server, sessionmaker_factory)
+        self.schema = schema
+
+    async def drop(self) -> None:
+        await self.engine.dispose()
+        await self.server.drop_schema(self.schema)
+
+
+class AsyncReadOnlyDatabase(AsyncDatabase):
+    """
+    A database that is shared by all tests that only read from it.
+
+    See [`ReadOnlyDatabase`][ReadOnlyDatabase] for details.
+    """
+
+    async def drop(self) -> None:
+        await self.engine.dispose()
+
+
 class AsyncDatabaseServer:
     def __init__(
-        self, engine: CanBeTurnedIntoAsyncEngine, schema: AsyncMigrator | None = None
+        self,
+        engine: CanBeTurnedIntoAsyncEngine,
+        schema: AsyncMigrator | None = None,
+        pool_size: int = 0,
+        background_drops: bool = False,
+        max_pending_drops: int = 32,
+        recycle_databases: bool = False,
+        clone_strategy: CloneStrategy = _DEFAULT_STRATEGY,
+        isolation: Literal["database", "schema"] = "database",
+        persistent_template: bool = False,
+        template_replicas: int = 1,
+        native_driver: bool = False,
+        engine_options: Mapping[str, Any] | None = None,
+        warm_up: bool = False,
+        track_writes: bool = False,
+        reuse_untouched: bool = False,
     ) -> None:
+        """
+        Params:
+            engine: an engine, URL or connection string pointing to the Postgres server.
+            schema: creates the schema of the template database, that all others are cloned from.
+            pool_size: how many spare databases to keep around. They are cloned from the template in a background
+                task, so [`create_database()`][AsyncDatabaseServer.create_database] can hand them out immediately.
+                Disabled by default.
+            background_drops: instead of dropping databases right away, [`drop_database()`][AsyncDatabaseServer.drop_database]
+                queues them up for a background task that drops them in batches.
+            max_pending_drops: how many databases may wait for being dropped in the background, before
+                [`drop_database()`][AsyncDatabaseServer.drop_database] blocks.
+            recycle_databases: instead of dropping databases, [`drop_database()`][AsyncDatabaseServer.drop_database]
+                resets them to the state of the template and keeps them around for the next call to
+                [`create_database()`][AsyncDatabaseServer.create_database].
+            clone_strategy: how databases are cloned from the template, see [`CloneStrategy`][CloneStrategy].
+            isolation: use `"schema"` to create a schema inside a single shared database for each call to
+                [`create_database()`][AsyncDatabaseServer.create_database], instead of a whole database.
+            persistent_template: name the template database after a fingerprint of the schema and reuse it in
+                future test sessions, as long as the schema does not change. Requires a migrator implementing
+                `fingerprint()`, like the built-in ones.
+            template_replicas: how many copies of the template to clone from, in turns. Postgres can not clone a
+                template while another session is cloning it, so more replicas let more clones run concurrently.
+            native_driver: send `CREATE DATABASE` and `DROP DATABASE` directly through the connection of the driver
+                (psycopg and psycopg2, or asyncpg for async), instead of going through SQLAlchemy's transaction
+                handling. Other drivers always use SQLAlchemy.
+            engine_options: keyword arguments for `create_async_engine()` when creating the engines of the databases.
+                Defaults to a small pool, so that many databases existing at the same time don't exhaust
+                `max_connections`.
+            warm_up: open the first connection of each new database right away, so the first query of a test does not
+                have to wait for it. Databases from the pool are warmed up in the background.
+            track_writes: install triggers in the template that record which tables a test writes to, so resetting a
+                database only truncates those. See [`Database.reset()`][AsyncDatabase.reset].
+            reuse_untouched: keep databases that were not written to when they are dropped, and hand them out again
+                instead of cloning the template. Requires Postgres 15 or newer, databases are always dropped otherwise.
+        """
+        if (
+            persistent_template
+            and schema is not None
+            and not isinstance(schema, Fingerprinted)
+        ):
+            raise ValueError(
+                f"persistent_template requires a migrator with a fingerprint() method, but {type(schema).__name__} has none."
+            )
+        if template_replicas < 1:
+            raise ValueError(
+                f"template_replicas must be at least 1, but was {template_replicas}."
+            )
         self._migrator = schema
         self._engine = _build_engine(engine)
         self._template_db_name: str | None = None
+        self._build_lock = Lock()
+        self._template_replica_count = template_replicas
+        self._template_replicas: list[str] = []
+        # Under xdist, workers start their turns at different replicas instead of all at the shared template
+        self._clones = count(xdist_worker_index())
+        self._native_driver = native_driver
+        self._engine_options = dict(
+            _ENGINE_OPTIONS if engine_options is None else engine_options
+        )
+        self._warm_up = warm_up
+        self._track_writes = track_writes
+        self._reuse_untouched = reuse_untouched
+        self._baselines: dict[str, int] = {}
+        self._read_only_databases: dict[str, str] = {}
+        self._snapshots: dict[str, str] = {}
+        self._derived_templates: dict[str, str] = {}
+        self._prototype: AsyncEngine | None = None
+        self._pool = (
+            _AsyncDatabasePool(size=pool_size, create=self._create_pooled_database)
+            if pool_size > 0
+            else None
+        )
+        self._dropper = (
+            _AsyncBackgroundDropper(
+                drop=self._drop_databases, max_pending=max_pending_drops
+            )
+            if background_drops
+            else None
+        )
+        self._clone_strategy = clone_strategy
+        self._recycle_databases = recycle_databases
+        self._recyclable: dict[str, tuple[str, str]] = {}
+        self._recycled: dict[tuple[str, str], list[str]] = {}
+        self._reset_plan: ResetPlan | None = None
+        self._reset_plan_lock = Lock()
+        self._isolation = isolation
+        self._persistent_template = persistent_template
+        self._shared_engine: AsyncEngine | None = None
+        self._schema_statements: list[RecordedStatement] = []
+        self._preparation_error: Exception | None = None
+        self._preparation: Task[None] | None = None
 
     @property
     def url(self) -> URL:
@@ -108,34 +378,743 @@ class AsyncDatabaseServer:
                     ) from error
                 await sleep(interval)
 
+    def prepare(self, encoding: str = "utf8") -> Self:
+        """
+        Starts building the template in a background task and returns immediately.
+
+        [`create_database()`][AsyncDatabaseServer.create_database] only waits for the build if it has not finished
+        yet, so the migrations can run while the rest of your test session is being set up. Needs a running event
+        loop, e.g. call it right after [`ensure_is_ready()`][AsyncDatabaseServer.ensure_is_ready] in an async fixture.
+        If the build has not finished when the server is used from another event loop, e.g. by tests that get their
+        own loop, it is cancelled and the template is built on the loop of the caller instead.
+        """
+        if self._preparation is None:
+            self._preparation = create_task(self._prepare(encoding))
+        return self
+
     async def create_database(
         self,
         prefix: str = "elefast",
-        encoding: str = "utf8",
+        encoding: str | None = None,
+        from_snapshot: str | None = None,
     ) -> AsyncDatabase:
-        template_db = self._template_db_name
-        if template_db is None:
-            engine = await _prepare_async_database(
-                self._engine, encoding=encoding, prefix="elefast-template-db"
+        if self._isolation == "schema":
+            return await self._create_schema(prefix)
+        if from_snapshot is not None:
+            engine = await self._clone_template(
+                prefix,
+                self._snapshot_encoding(from_snapshot, encoding),
+                template=from_snapshot,
             )
+            return AsyncDatabase(engine=engine, server=self)
+
+        if encoding is None:
+            encoding = "utf8"
+        await self._ensure_template(encoding)
+
+        options = (prefix, encoding)
+        if recycled := self._take_recycled_database(options):
+            assert self._prototype is not None
+            engine = _derive_async_engine(self._prototype, recycled)
+            if self._warm_up:
+                await _warm_up(engine)
+        elif self._pool is not None and options == _POOLED_DATABASE_OPTIONS:
+            engine = await self._pool.take()
+        else:
+            engine = await self._clone_template(prefix, encoding)
+        if self._recycle_databases or self._reuse_untouched:
+            assert engine.url.database
+            self._recyclable[engine.url.database] = options
+            if self._reuse_untouched:
+                await self._record_baseline(engine.url.database)
+        return AsyncDatabase(engine=engine, server=self)
+
+    async def create_databases(
+        self,
+        n: int,
+        prefix: str = "elefast",
+        encoding: str = "utf8",
+        concurrency: int = 4,
+    ) -> list[AsyncDatabase]:
+        """
+        Creates `n` databases at once, cloning up to `concurrency` of them at the same time.
+
+        If any of them can not be created, the others are cancelled and dropped again, and all errors are raised
+        together.
+        """
+        semaphore = Semaphore(concurrency)
+        databases: list[AsyncDatabase] = []
+
+        async def create() -> None:
+            async with semaphore:
+                databases.append(
+                    await self.create_database(prefix=prefix, encoding=encoding)
+                )
+
+        try:
+            async with TaskGroup() as group:
+                for _ in range(n):
+                    group.create_task(create())
+        except BaseException:
+            # Also when we are cancelled ourselves, the databases would leak otherwise
+            for database in databases:
+                await database.drop()
+            raise
+        return databases
+
+    async def create_read_only_database(
+        self, encoding: str = "utf8"
+    ) -> AsyncReadOnlyDatabase:
+        """
+        Hands out a database that is shared by all callers and rejects writes.
+
+        See [`DatabaseServer.create_read_only_database()`][DatabaseServer.create_read_only_database] for details.
+        """
+        name = self._read_only_databases.get(encoding)
+        if name is None:
+            await self._ensure_template(encoding)
+            async with self._build_lock:
+                name = self._read_only_databases.get(encoding)
+                if name is None:
+                    name = await self._create_read_only_database(encoding)
+                    self._read_only_databases[encoding] = name
+        assert self._prototype is not None
+        engine = _derive_async_engine(self._prototype, name)
+        return AsyncReadOnlyDatabase(engine=engine, server=self)
+
+    async def derive_template(
+        self,
+        key: str,
+        seed: Callable[[AsyncConnection], Awaitable[None]],
+        parent: str | None = None,
+        encoding: str = "utf8",
+    ) -> str:
+        """
+        Builds a template by running `seed` on a clone of the template derived under the `parent` key, or of the
+        template created by the migrator, and caches it under `key`.
+
+        See [`DatabaseServer.derive_template()`][DatabaseServer.derive_template] for details.
+        """
+        if self._isolation == "schema":
+            raise ValueError(
+                'Derived templates are not supported with isolation="schema".'
+            )
+        if (name := self._derived_templates.get(key)) is not None:
+            return name
+        await self._ensure_template(encoding)
+        async with self._build_lock:
+            if (name := self._derived_templates.get(key)) is None:
+                name = await self._build_derived_template(seed, parent, encoding)
+                self._derived_templates[key] = name
+        return name
+
+    async def snapshot_database(self, name: str) -> str:
+        """
+        Creates a copy of the database called `name`, that can be cloned like a template.
+
+        See [`DatabaseServer.snapshot_database()`][DatabaseServer.snapshot_database] for details.
+        """
+        if self._isolation == "schema":
+            raise ValueError('Snapshots are not supported with isolation="schema".')
+        async with self._engine.connect() as connection:
+            result = await connection.execute(text(_ENCODING_QUERY), {"name": name})
+            encoding = result.scalar_one()
+        engine = await self._clone("elefast-snapshot", encoding, template=name)
+        # Nobody may be connected to a database while it is cloned
+        await engine.dispose()
+        snapshot = engine.url.database
+        assert snapshot
+        self._snapshots[snapshot] = encoding
+        return snapshot
+
+    async def drop_database(self, name: str) -> None:
+        if (options := self._recyclable.pop(name, None)) is not None:
+            if await self._is_untouched(name):
+                self._recycled.setdefault(options, []).append(name)
+                return
+            if self._recycle_databases:
+                try:
+                    await self._reset_database(name)
+                except DBAPIError:
+                    pass  # We could not reset it, so we drop it like any other database
+                else:
+                    self._recycled.setdefault(options, []).append(name)
+                    return
+        if self._dropper is not None:
+            await self._dropper.submit(name)
+        else:
+            await self._drop_databases([name])
+
+    async def drop_schema(self, name: str) -> None:
+        """
+        Drops a schema created when using `isolation="schema"`, together with everything inside it.
+        """
+        assert self._shared_engine is not None
+        async with self._shared_engine.begin() as connection:
+            await connection.exec_driver_sql(f'DROP SCHEMA "{name}" CASCADE')
+
+    async def close(self) -> None:
+        """
+        Stops background work, drops the spare databases of the pool and waits for pending drops.
+
+        Call this at the end of your test session, e.g. after `yield`ing the server from a session-scoped fixture.
+        """
+        self._leave_foreign_preparation()
+        if self._preparation is not None:
+            await self._preparation
+            self._preparation = None
+        if self._pool is not None:
+            for engine in await self._pool.close():
+                await engine.dispose()
+                assert engine.url.database
+                await self.drop_database(engine.url.database)
+        recycled, self._recycled = self._recycled, {}
+        for names in recycled.values():
+            for name in names:
+                await self.drop_database(name)
+        if self._shared_engine is not None:
+            await self._shared_engine.dispose()
+            assert self._shared_engine.url.database
+            await self.drop_database(self._shared_engine.url.database)
+            self._shared_engine = None
+        self._derived_templates = {}
+        snapshots, self._snapshots = self._snapshots, {}
+        for name in snapshots:
+            await self.drop_database(name)
+        read_only, self._read_only_databases = self._read_only_databases, {}
+        for name in read_only.values():
+            await self.drop_database(name)
+        replicas, self._template_replicas = self._template_replicas, []
+        for name in replicas:
+            await self.drop_database(name)
+        if self._dropper is not None:
+            await self._dropper.close()
+
+    async def reset_plan(self) -> ResetPlan:
+        """
+        Describes how to return a database to the state of the template, see [`AsyncDatabase.reset()`][AsyncDatabase.reset].
+
+        It is computed from the template the first time it is needed.
+        """
+        if (plan := self._reset_plan) is not None:
+            return plan
+        template = self._template_db_name
+        assert template, "The template database has not been created yet"
+        return await self._load_reset_plan(template)
+
+    async def _load_reset_plan(self, template: str) -> ResetPlan:
+        # Concurrent callers wait for the first one to inspect the template, instead of inspecting it themselves
+        async with self._reset_plan_lock:
+            if self._reset_plan is None:
+                engine = create_async_engine(
+                    self._engine.url.set(database=template), poolclass=NullPool
+                )
+                async with engine.connect() as connection:
+                    self._reset_plan = await connection.run_sync(
+                        ResetPlan.from_template
+                    )
+                await engine.dispose()
+            return self._reset_plan
+
+    async def _prepare(self, encoding: str) -> None:
+        try:
+            if self._isolation == "schema":
+                await self._ensure_schema_template()
+            else:
+                await self._ensure_template(encoding)
+        except Exception as error:  # noqa: BLE001 - raised by create_database()
+            # Instead of getting lost in the background
+            self._preparation_error = error
+
+    def _leave_foreign_preparation(self) -> None:
+        # A task on an event loop that does not run anymore never releases the build lock, so we would wait forever
+        task = self._preparation
+        if task is None or task.get_loop() is get_running_loop():
+            return
+        self._preparation = None
+        if not task.done():
+            with suppress(RuntimeError):  # Its event loop is already closed
+                task.cancel()
+        self._build_lock = Lock()
+
+    def _raise_preparation_error(self) -> None:
+        # Raised only once, so that later calls build the template again
+        if (error := self._preparation_error) is not None:
+            self._preparation_error = None
+            raise error
+
+    async def _ensure_template(self, encoding: str) -> str:
+        if (template_db := self._template_db_name) is not None:
+            return template_db
+        self._leave_foreign_preparation()
+        # Concurrent callers wait for the first one to build the template, instead of building their own
+        async with self._build_lock:
+            template_db = self._template_db_name
+            if template_db is None:
+                self._raise_preparation_error()
+                shared_name = self._shared_template_name(encoding)
+                if shared_name is None:
+                    template_db = await self._build_template(encoding)
+                else:
+                    async with self._template_lock(shared_name):
+                        template_db = await self._ensure_shared_template(
+                            shared_name, encoding
+                        )
+                await self._create_template_replicas(template_db, encoding)
+                # Only publish the template once everything that is derived from it is ready
+                if self._recycle_databases:
+                    await self._load_reset_plan(template_db)
+                self._template_db_name = template_db
+        return template_db
+
+    async def _ensure_shared_template(self, name: str, encoding: str) -> str:
+        if await self._database_exists(name):
+            # Another process built the template. This engine never connects, so it does not block cloning.
+            self._prototype = create_async_engine(
+                self._engine.url.set(database=name), **self._engine_options
+            )
+            return name
+        base = (
+            await self._upgradable_template(encoding)
+            if self._persistent_template
+            else None
+        )
+        template_db = await self._build_template(encoding, base)
+        return await self._persist_template(template_db, name)
+
+    @asynccontextmanager
+    async def _template_lock(self, name: str) -> AsyncIterator[None]:
+        # Makes sure only one process builds the template, while the others wait and reuse it
+        key = {"key": lock_key(name)}
+        async with self._engine.connect() as connection:
+            await connection.execute(text("SELECT pg_advisory_lock(:key)"), key)
+            try:
+                yield
+            finally:
+                await connection.execute(text("SELECT pg_advisory_unlock(:key)"), key)
+
+    async def _build_template(self, encoding: str, base: str | None = None) -> str:
+        engine = await _prepare_async_database(
+            self._engine,
+            native=self._native_driver,
+            encoding=encoding,
+            prefix="elefast-template-db",
+            template=base,
+            strategy=self._clone_strategy,
+            options=self._engine_options,
+        )
+        template_db = engine.url.database
+        assert isinstance(template_db, str)
+        try:
             if self._migrator:
                 async with engine.begin() as connection:
                     await self._migrator.migrate_async(connection)
                     await connection.commit()
+            if self._track_writes:
+                async with engine.begin() as connection:
+                    await connection.run_sync(install_write_tracking)
+            if self._recycle_databases:
+                # Computing this later would require connecting to the template, which blocks cloning it
+                async with engine.connect() as connection:
+                    self._reset_plan = await connection.run_sync(
+                        ResetPlan.from_template
+                    )
+        except Exception:
+            # Do not leak a half-migrated template, nothing would ever drop it
             await engine.dispose()
-            template_db = engine.url.database
-            assert isinstance(template_db, str)
-            self._template_db_name = template_db
+            await self._drop_databases([template_db])
+            raise
+        await engine.dispose()
+        # Clones get engines derived from this one, sharing its dialect and compiled statement cache
+        self._prototype = engine
+        return template_db
 
-        engine = await _prepare_async_database(
-            self._engine, encoding=encoding, prefix=prefix, template=template_db
-        )
-        return AsyncDatabase(engine=engine, server=self)
+    def _shared_template_name(self, encoding: str) -> str | None:
+        if self._migrator is None:
+            fingerprint = ""
+        elif isinstance(self._migrator, Fingerprinted):
+            fingerprint = self._migrator.fingerprint()
+        else:
+            return None
+        if self._track_writes:
+            # Templates with triggers must not be mixed up with the ones without
+            fingerprint += ":tracked"
+        if self._persistent_template:
+            return template_name(fingerprint, encoding)
+        return xdist_template_name(fingerprint, encoding)
 
-    async def drop_database(self, name: str) -> None:
+    async def _persist_template(self, template_db: str, name: str) -> str:
+        try:
+            async with self._engine.begin() as connection:
+                statement = f'ALTER DATABASE "{template_db}" RENAME TO "{name}"'
+                await connection.execute(text(statement))
+        except DBAPIError:
+            if not await self._database_exists(name):
+                raise
+            # Another test session persisted the same schema in the meantime
+            await self._drop_databases([template_db])
+            return name
+        if isinstance(self._migrator, Upgradable):
+            statement = revision_comment_statement(name, self._migrator.revision())
+            try:
+                async with self._engine.begin() as connection:
+                    await connection.execute(text(statement))
+            except DBAPIError:
+                # Without its revision, later sessions could not upgrade the template, so build it again next time
+                await self._drop_databases([name])
+                raise
+        return name
+
+    async def _upgradable_template(self, encoding: str) -> str | None:
+        if not isinstance(self._migrator, Upgradable):
+            return None
+        async with self._engine.connect() as connection:
+            result = await connection.execute(text(CANDIDATES_QUERY))
+            candidates = result.tuples().all()
+        return upgradable_template(self._migrator, encoding, candidates)
+
+    async def _database_exists(self, name: str) -> bool:
+        async with self._engine.connect() as connection:
+            result = await connection.execute(
+                text("SELECT 1 FROM pg_database WHERE datname = :name"),
+                {"name": name},
+            )
+            return result.first() is not None
+
+    async def _create_schema(self, prefix: str) -> AsyncDatabaseSchema:
+        shared_engine = await self._ensure_schema_template()
+        schema = f"{prefix}_{uuid4().hex}"
+        async with shared_engine.begin() as connection:
+            await connection.run_sync(
+                replay_statements, schema, self._schema_statements
+            )
+        assert shared_engine.url.database
+        engine = _derive_async_engine(shared_engine, shared_engine.url.database)
+        pin_search_path(engine.sync_engine, schema)
+        return AsyncDatabaseSchema(engine=engine, server=self, schema=schema)
+
+    async def _ensure_schema_template(self) -> AsyncEngine:
+        if self._shared_engine is not None:
+            return self._shared_engine
+        self._leave_foreign_preparation()
+        async with self._build_lock:
+            if self._shared_engine is None:
+                self._raise_preparation_error()
+                engine = await _prepare_async_database(
+                    self._engine,
+                    native=self._native_driver,
+                    prefix="elefast-shared-db",
+                    options=self._engine_options,
+                )
+                try:
+                    async with engine.begin() as connection:
+                        await connection.exec_driver_sql(
+                            f'CREATE SCHEMA "{_TEMPLATE_SCHEMA}"'
+                        )
+                        await connection.exec_driver_sql(
+                            f"SET LOCAL search_path TO {search_path(_TEMPLATE_SCHEMA)}"
+                        )
+                        # Instead of running the migrator again for each schema, we replay what it did
+                        with record_statements(
+                            connection.sync_connection
+                        ) as statements:
+                            if self._migrator:
+                                await self._migrator.migrate_async(connection)
+                except Exception:
+                    await engine.dispose()
+                    assert engine.url.database
+                    await self._drop_databases([engine.url.database])
+                    raise
+                self._schema_statements = statements
+                self._shared_engine = engine
+            return self._shared_engine
+
+    def _snapshot_encoding(self, snapshot: str, encoding: str | None) -> str:
+        if (snapshot_encoding := self._snapshots.get(snapshot)) is None:
+            raise ValueError(f"There is no snapshot called {snapshot!r}.")
+        if encoding is not None and _encoding_key(encoding) != _encoding_key(
+            snapshot_encoding
+        ):
+            raise ValueError(
+                f"The snapshot {snapshot!r} uses the encoding {snapshot_encoding!r}, not {encoding!r}."
+            )
+        return snapshot_encoding
+
+    def _take_recycled_database(self, options: tuple[str, str]) -> str | None:
+        try:
+            return self._recycled.get(options, []).pop()
+        except IndexError:
+            return None
+
+    async def _build_derived_template(
+        self,
+        seed: Callable[[AsyncConnection], Awaitable[None]],
+        parent: str | None,
+        encoding: str,
+    ) -> str:
+        template = None
+        if parent is not None:
+            if parent not in self._derived_templates:
+                raise ValueError(f"There is no derived template for {parent!r}.")
+            template = self._derived_templates[parent]
+        engine = await self._clone("elefast-template-db", encoding, template=template)
+        name = engine.url.database
+        assert name
+        try:
+            async with engine.begin() as connection:
+                await seed(connection)
+        except Exception:
+            await engine.dispose()
+            await self._drop_databases([name])
+            raise
+        # Nobody may be connected to a database while it is cloned
+        await engine.dispose()
+        self._snapshots[name] = encoding
+        return name
+
+    async def _create_read_only_database(self, encoding: str) -> str:
+        engine = await self._clone_template("elefast-read-only", encoding)
+        # The setting only applies to new connections, so we must not keep the ones opened so far
+        await engine.dispose()
+        name = engine.url.database
+        assert name
         async with self._engine.begin() as connection:
-            statement = f'DROP DATABASE "{name}"'
+            statement = (
+                f'ALTER DATABASE "{name}" SET default_transaction_read_only = on'
+            )
             await connection.execute(text(statement))
+        return name
+
+    async def _record_baseline(self, name: str) -> None:
+        if (self._engine.dialect.server_version_info or (0,)) < (15,):
+            return  # Older servers report statistics asynchronously, so we can't tell whether a database is untouched
+        async with self._engine.connect() as connection:
+            _, self._baselines[name] = await connection.run_sync(written_tuples, name)
+
+    async def _is_untouched(self, name: str) -> bool:
+        if (baseline := self._baselines.pop(name, None)) is None:
+            return False
+        async with self._engine.connect() as connection:
+            for _ in range(_UNTOUCHED_POLLS):
+                backends, tuples = await connection.run_sync(written_tuples, name)
+                if backends == 0:
+                    return tuples == baseline
+                await sleep(_UNTOUCHED_POLL_INTERVAL)
+        return False
+
+    async def _reset_database(self, name: str) -> None:
+        engine = create_async_engine(
+            self._engine.url.set(database=name), poolclass=NullPool
+        )
+        try:
+            plan = await self.reset_plan()
+            async with engine.begin() as connection:
+                await connection.run_sync(plan.apply)
+        finally:
+            await engine.dispose()
+
+    async def _drop_databases(self, names: list[str]) -> None:
+        # Each database is dropped on its own, so one that is still in use does not keep the others around
+        errors: list[Exception] = []
+        for name in names:
+            try:
+                await _execute_admin_statements(
+                    self._engine, [f'DROP DATABASE "{name}"'], self._native_driver
+                )
+            except Exception as error:  # noqa: BLE001 - raised below
+                errors.append(error)
+        if len(names) == 1 and errors:
+            raise errors[0]
+        if errors:
+            raise ExceptionGroup("Could not drop all databases", errors)
+
+    async def _create_pooled_database(self) -> AsyncEngine:
+        return await self._clone_template(*_POOLED_DATABASE_OPTIONS)
+
+    async def _clone_template(
+        self, prefix: str, encoding: str, template: str | None = None
+    ) -> AsyncEngine:
+        engine = await self._clone(prefix, encoding, template)
+        if self._warm_up:
+            await _warm_up(engine)
+        return engine
+
+    async def _clone(
+        self, prefix: str, encoding: str, template: str | None = None
+    ) -> AsyncEngine:
+        # Clones the given database, or the template (and its replicas) by default
+        attempts = 0
+        while True:
+            try:
+                engine = await _prepare_async_database(
+                    self._engine,
+                    native=self._native_driver,
+                    prefix=prefix,
+                    encoding=encoding,
+                    template=template or self._next_template(),
+                    strategy=self._clone_strategy,
+                    prototype=self._prototype,
+                    options=self._engine_options,
+                )
+            except DBAPIError as error:
+                attempts += 1
+                if attempts >= _CLONE_ATTEMPTS or not template_in_use(error):
+                    raise
+                await sleep(_CLONE_RETRY_INTERVAL * attempts)
+            else:
+                break
+        return engine
+
+    def _next_template(self) -> str:
+        assert self._template_db_name is not None
+        templates = [self._template_db_name, *self._template_replicas]
+        return templates[next(self._clones) % len(templates)]
+
+    async def _create_template_replicas(self, template_db: str, encoding: str) -> None:
+        for _ in range(self._template_replica_count - 1):
+            # Other processes may be cloning the same shared template right now
+            engine = await self._clone(
+                "elefast-template-replica", encoding, template=template_db
+            )
+            await engine.dispose()
+            assert engine.url.database
+            self._template_replicas.append(engine.url.database)
+
+
+_TEMPLATE_SCHEMA = "elefast_template"
+"""The schema that is migrated once when using `isolation="schema"`."""
+
+_ENGINE_OPTIONS: Mapping[str, Any] = MappingProxyType(
+    {"pool_size": 2, "max_overflow": 3}
+)
+"""The default `engine_options`, a test usually needs one or two connections at a time."""
+
+_CLONE_ATTEMPTS = 5
+"""How often we try to clone a template that is being accessed by another session."""
+
+_CLONE_RETRY_INTERVAL = 0.1
+"""Seconds to wait before the first retry, increasing linearly with each attempt."""
+
+_ENCODING_QUERY = (
+    "SELECT pg_encoding_to_char(encoding) FROM pg_database WHERE datname = :name"
+)
+
+
+_UNTOUCHED_POLLS = 50
+"""How often we check whether the connections to a dropped database are gone, before we give up on reusing it."""
+
+_UNTOUCHED_POLL_INTERVAL = 0.01
+"""Seconds between these checks."""
+
+_POOLED_DATABASE_OPTIONS = ("elefast", "utf8")
+"""The `prefix` and `encoding` of databases in the pool. Databases requested with other options bypass it."""
+
+
+class _AsyncDatabasePool:
+    """
+    Keeps `size` spare databases around, which are refilled by a background task.
+    """
+
+    def __init__(self, size: int, create: Callable[[], Awaitable[AsyncEngine]]) -> None:
+        self._size = size
+        self._create = create
+        self._spares: deque[AsyncEngine | Exception] = deque()
+        self._task: Task[None] | None = None
+        self._closed = False
+
+    async def take(self) -> AsyncEngine:
+        if self._closed:
+            raise RuntimeError("The pool of databases has been closed.")
+        if self._spares:
+            spare = self._spares.popleft()
+        else:
+            # Instead of waiting for the background task, which might belong to another event loop, we clone it here
+            spare = await self._create()
+        self._start_filling()
+        if isinstance(spare, Exception):
+            # Each error is only handed to a single caller, the next one gets a database cloned after it
+            raise spare
+        return spare
+
+    async def close(self) -> list[AsyncEngine]:
+        """
+        Stops the background task and returns the spares that were not handed out.
+        """
+        self._closed = True
+        if self._task is not None and self._task.get_loop() is get_running_loop():
+            await self._task
+        self._task = None
+        spares = [spare for spare in self._spares if not isinstance(spare, Exception)]
+        self._spares.clear()
+        return spares
+
+    def _start_filling(self) -> None:
+        # Tasks are bound to their event loop, e.g. pytest-asyncio might use a new one for each test
+        task = self._task
+        if task is None or task.done() or task.get_loop() is not get_running_loop():
+            self._task = create_task(self._fill(), name="elefast-pool")
+
+    async def _fill(self) -> None:
+        while not self._closed and len(self._spares) < self._size:
+            try:
+                self._spares.append(await self._create())
+            except Exception as error:  # noqa: BLE001 - raised by take()
+                self._spares.append(error)
+                return  # The next call to take() starts filling again
+
+
+class _AsyncBackgroundDropper:
+    """
+    Drops databases one after another from a background task.
+    """
+
+    def __init__(
+        self, drop: Callable[[list[str]], Awaitable[None]], max_pending: int
+    ) -> None:
+        self._drop = drop
+        self._max_pending = max_pending
+        self._pending: deque[str] = deque()
+        self._errors: list[Exception] = []
+        self._task: Task[None] | None = None
+
+    async def submit(self, name: str) -> None:
+        self._pending.append(name)
+        task = self._start_working()
+        if len(self._pending) >= self._max_pending:
+            # Waits in case there are already too many databases waiting to be dropped
+            await task
+
+    async def close(self) -> None:
+        """
+        Waits until all pending databases are dropped and stops the background task.
+        """
+        if self._pending:
+            await self._start_working()
+        elif self._task is not None and self._task.get_loop() is get_running_loop():
+            await self._task
+        self._task = None
+        if self._errors:
+            errors, self._errors = self._errors, []
+            raise ExceptionGroup("Could not drop all databases", errors)
+
+    def _start_working(self) -> Task[None]:
+        # Tasks are bound to their event loop, e.g. pytest-asyncio might use a new one for each test
+        task = self._task
+        if task is None or task.done() or task.get_loop() is not get_running_loop():
+            task = self._task = create_task(self._work(), name="elefast-dropper")
+        return task
+
+    async def _work(self) -> None:
+        while self._pending:
+            name = self._pending.popleft()
+            try:
+                await self._drop([name])
+            except CancelledError:
+                # The event loop is shutting down, the worker on the next one drops it instead
+                self._pending.appendleft(name)
+                raise
+            except Exception as error:  # noqa: BLE001 - raised by close()
+                self._errors.append(error)
 
 
 async def _prepare_async_database(
@@ -143,17 +1122,54 @@ async def _prepare_async_database(
     prefix: str = "elefast",
     encoding: str = "utf8",
     template: str | None = None,
+    strategy: CloneStrategy = _DEFAULT_STRATEGY,
+    native: bool = False,
+    prototype: AsyncEngine | None = None,
+    options: Mapping[str, Any] | None = None,
 ) -> AsyncEngine:
     database = f"{prefix}-{uuid4()}"
-    async with engine.begin() as connection:
-        statement = (
-            f"CREATE DATABASE \"{database}\" ENCODING '{encoding}' TEMPLATE template0"
-            if template is None
-            else f'CREATE DATABASE "{database}" WITH TEMPLATE "{template}" ENCODING \'{encoding}\''
-        )
-        await connection.execute(text(statement))
-        await connection.commit()
-    return create_async_engine(engine.url.set(database=database))
+    statement = (
+        f"CREATE DATABASE \"{database}\" ENCODING '{encoding}' TEMPLATE template0"
+        if template is None
+        else strategy.create_database_statement(database, template, encoding)
+    )
+    await _execute_admin_statements(engine, [statement], native)
+    if prototype is not None:
+        return _derive_async_engine(prototype, database)
+    return create_async_engine(engine.url.set(database=database), **(options or {}))
+
+
+async def _execute_admin_statements(
+    engine: AsyncEngine, statements: list[str], native: bool = False
+) -> None:
+    if not native or engine.dialect.driver != "asyncpg":
+        async with engine.begin() as connection:
+            for statement in statements:
+                await connection.execute(text(statement))
+            await connection.commit()
+        return
+    # asyncpg runs statements outside of a transaction unless told otherwise, so we skip SQLAlchemy's transaction
+    # handling for these statements, which can't run inside a transaction anyway
+    async with engine.connect() as connection:
+        raw_connection = await connection.get_raw_connection()
+        driver_connection = raw_connection.driver_connection
+        for statement in statements:
+            await driver_connection.execute(statement)
+
+
+def _encoding_key(encoding: str) -> str:
+    # Postgres ignores case and punctuation in encoding names, e.g. "UTF8" and "utf-8" are the same
+    return "".join(character for character in encoding.lower() if character.isalnum())
+
+
+async def _warm_up(engine: AsyncEngine) -> None:
+    # Returning the connection keeps it in the pool of the engine
+    async with engine.connect():
+        pass
+
+
+def _derive_async_engine(prototype: AsyncEngine, database: str) -> AsyncEngine:
+    return AsyncEngine(derive_engine(prototype.sync_engine, database))
 
 
 def _build_engine(input: CanBeTurnedIntoAsyncEngine) -> AsyncEngine:
@@ -0,0 +1,72 @@
+"""
+Strategies for cloning the template database, see the `clone_strategy` parameter of
+[`DatabaseServer`][DatabaseServer] and [`AsyncDatabaseServer`][AsyncDatabaseServer].
+"""
+
+from typing import Protocol
+
+from sqlalchemy.exc import DBAPIError
+
+_OBJECT_IN_USE = "55006"
+
+
+class CloneStrategy(Protocol):
+    """
+    Decides how a new database is created from the template.
+    """
+
+    def create_database_statement(
+        self, database: str, template: str, encoding: str
+    ) -> str:
+        """
+        Returns the statement that creates `database` as a copy of `template`.
+        """
+        ...
+
+
+class TemplateClone(CloneStrategy):
+    """
+    Runs a plain `CREATE DATABASE ... WITH TEMPLATE` and lets Postgres decide how to copy the files.
+
+    This is the default and equivalent to `WalLogClone` on Postgres 15 and newer.
+    """
+
+    _strategy: str | None = None
+
+    def create_database_statement(
+        self, database: str, template: str, encoding: str
+    ) -> str:
+        statement = f'CREATE DATABASE "{database}" WITH TEMPLATE "{template}" ENCODING \'{encoding}\''
+        if self._strategy is not None:
+            statement += f" STRATEGY {self._strategy}"
+        return statement
+
+
+class WalLogClone(TemplateClone):
+    """
+    Copies the template block by block through the write-ahead log (`STRATEGY WAL_LOG`, Postgres 15+).
+
+    This avoids checkpoints, so it is the better choice for large templates, but it has a higher fixed cost for
+    templates with only a few tables.
+    """
+
+    _strategy = "WAL_LOG"
+
+
+class FileCopyClone(TemplateClone):
+    """
+    Copies the files of the template directly (`STRATEGY FILE_COPY`, Postgres 15+).
+
+    This is how all Postgres versions before 15 clone databases. It is fast for tiny templates, but forces a
+    checkpoint for every clone, which gets expensive as the template grows.
+    """
+
+    _strategy = "FILE_COPY"
+
+
+def template_in_use(error: DBAPIError) -> bool:
+    """
+    Whether cloning failed because another session was connected to the template (or cloning it) at the same time.
+    """
+    code = getattr(error.orig, "sqlstate", None) or getattr(error.orig, "pgcode", None)
+    return code == _OBJECT_IN_USE or "is being accessed by other users" in str(error)
@@ -0,0 +1,74 @@
+"""
+Utilities for creating the engines of test databases, without paying for a fresh SQLAlchemy setup every time.
+"""
+
+from __future__ import annotations
+
+from contextvars import ContextVar
+from typing import Any
+
+from sqlalchemy import URL, Dialect, Engine, event
+
+_TARGET: ContextVar[tuple[URL, URL] | None] = ContextVar("elefast_target", default=None)
+"""The URL of the prototype and of the derived engine, while the derived engine opens a connection."""
+
+
+def derive_engine(prototype: Engine, database: str) -> Engine:
+    """
+    Creates an engine for `database`, that shares the dialect and the compiled statement cache of `prototype`.
+
+    All databases are clones of the same template on the same server, so statements compiled for one of them can be
+    reused for all others. SQLAlchemy includes the dialect in the cache key, so sharing the cache only helps if the
+    dialect is shared as well, which also means it is only initialized once, when the first of these engines connects.
+
+    Connections are opened like the ones of `prototype`, including its `connect_args` and `do_connect` listeners,
+    just to `database` instead.
+    """
+    url = prototype.url.set(database=database)
+    dialect = prototype.dialect
+    if not event.contains(dialect, "do_connect", _retarget):
+        event.listen(dialect, "do_connect", _retarget)
+    # The creator of the prototype keeps the connect_args and do_connect listeners, we only swap the database
+    creator = prototype.pool._invoke_creator
+
+    def connect(connection_record=None):
+        token = _TARGET.set((prototype.url, url))
+        try:
+            return creator(connection_record)
+        finally:
+            _TARGET.reset(token)
+
+    # Recreating the pool keeps its configuration and the event listeners that create_engine() registered on it
+    pool = prototype.pool.recreate()
+    pool._creator = connect
+    engine = Engine(
+        pool,
+        dialect,
+        url,
+        logging_name=prototype.logging_name,
+        echo=prototype.echo,
+        execution_options=prototype._execution_options,
+        hide_parameters=prototype.hide_parameters,
+    )
+    engine._compiled_cache = prototype._compiled_cache
+    return engine
+
+
+def _retarget(
+    dialect: Dialect, connection_record: Any, cargs: list[Any], cparams: dict[str, Any]
+) -> None:
+    if (target := _TARGET.get()) is None:
+        return
+    source, destination = target
+    _, source_cparams = dialect.create_connect_args(source)
+    destination_cargs, destination_cparams = dialect.create_connect_args(destination)
+    # Everything that does not come from the URL, e.g. connect_args, applies to the derived engine as well
+    extra = {
+        key: value
+        for key, value in cparams.items()
+        if key not in source_cparams or source_cparams[key] != value
+    }
+    cargs[:] = destination_cargs
+    cparams.clear()
+    cparams.update(destination_cparams)
+    cparams.update(extra)
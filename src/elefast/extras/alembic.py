@@ -2,10 +2,14 @@
 Utility functions for working with [Alembic](https://alembic.sqlalchemy.org).
 """
 
+from hashlib import sha256
 from os import PathLike
+from pathlib import Path
 
 from alembic import command
 from alembic.config import Config
+from alembic.script import ScriptDirectory
+from alembic.util import CommandError
 from sqlalchemy import Connection
 from sqlalchemy.ext.asyncio import AsyncConnection
 
@@ -39,3 +43,44 @@ class AlembicMigrator(Migrator, AsyncMigrator):
 
     async def migrate_async(self, connection: AsyncConnection) -> None:
         await connection.run_sync(_upgrade_head, self._config())
+
+    def fingerprint(self) -> str:
+        """
+        A hash of your `env.py` and all revision files, so templates can be reused until you add or edit a migration.
+        """
+        fingerprint = self.fingerprint_at(self.revision())
+        assert fingerprint is not None
+        return fingerprint
+
+    def revision(self) -> str:
+        """
+        The current head revision(s) of your migrations.
+        """
+        return ",".join(sorted(self._script().get_heads()))
+
+    def fingerprint_at(self, revision: str) -> str | None:
+        """
+        The [`fingerprint()`][elefast.extras.alembic.AlembicMigrator.fingerprint] your migrations had at `revision`,
+        used to find templates that only lack the newest migrations.
+        """
+        script = self._script()
+        heads = revision.split(",") if revision else []
+        try:
+            revisions = [
+                script_revision
+                for head in heads
+                for script_revision in script.walk_revisions(head=head)
+            ]
+        except CommandError:
+            return None
+        paths = {Path(script_revision.path) for script_revision in revisions}
+        env = Path(script.dir) / "env.py"
+        if env.exists():
+            paths.add(env)
+        digest = sha256()
+        for path in sorted(paths):
+            digest.update(path.read_bytes())
+        return digest.hexdigest()
+
+    def _script(self) -> ScriptDirectory:
+        return ScriptDirectory.from_config(self._config())
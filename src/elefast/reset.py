@@ -0,0 +1,237 @@
+"""
+Utilities for returning a database to the state of its template, without dropping and cloning it again.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any
+
+from sqlalchemy import Connection, MetaData, Table, bindparam, inspect, text
+
+TRACKING_SCHEMA = "elefast_tracking"
+"""The schema that [`install_write_tracking()`][elefast.reset.install_write_tracking] creates in the template."""
+
+_SYSTEM_SCHEMAS = {"information_schema", "pg_catalog", "pg_toast", TRACKING_SCHEMA}
+
+_TRACKING_STATEMENTS = (
+    f"CREATE SCHEMA IF NOT EXISTS {TRACKING_SCHEMA}",
+    f"CREATE UNLOGGED TABLE IF NOT EXISTS {TRACKING_SCHEMA}.written_tables (relid oid PRIMARY KEY)",
+    f"""CREATE OR REPLACE FUNCTION {TRACKING_SCHEMA}.mark_written() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO {TRACKING_SCHEMA}.written_tables VALUES (TG_RELID) ON CONFLICT DO NOTHING;
+    RETURN NULL;
+END $$""",
+    f"""DO $$
+DECLARE
+    name text;
+BEGIN
+    FOR name IN
+        SELECT format('%I.%I', n.nspname, c.relname) FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE c.relkind IN ('r', 'p') AND n.nspname NOT IN ('information_schema', '{TRACKING_SCHEMA}')
+        AND n.nspname NOT LIKE 'pg\\_%'
+        AND NOT EXISTS (SELECT FROM pg_trigger t WHERE t.tgrelid = c.oid AND t.tgname = 'elefast_mark_written')
+    LOOP
+        EXECUTE format(
+            'CREATE TRIGGER elefast_mark_written AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %s '
+            'FOR EACH STATEMENT EXECUTE FUNCTION {TRACKING_SCHEMA}.mark_written()',
+            name
+        );
+    END LOOP;
+END $$""",
+)
+
+_WRITTEN_TABLES_QUERY = (
+    "SELECT n.nspname, c.relname "
+    f"FROM {TRACKING_SCHEMA}.written_tables w JOIN pg_class c ON c.oid = w.relid "
+    "JOIN pg_namespace n ON n.oid = c.relnamespace"
+)
+
+
+_WRITTEN_TUPLES_QUERY = (
+    "SELECT (SELECT count(*) FROM pg_stat_activity WHERE datname = :name), "
+    "tup_inserted + tup_updated + tup_deleted FROM pg_stat_database WHERE datname = :name"
+)
+
+
+def written_tuples(connection: Connection, name: str) -> tuple[int, int]:
+    """
+    Returns how many backends are connected to the database called `name`, and how many tuples have been inserted,
+    updated or deleted in it so far. The latter includes the system catalogs, so DDL is counted as well.
+
+    Backends only report their counts from time to time, at the latest when they exit. Since Postgres 15, all counts
+    of a backend are visible once it no longer shows up as connected.
+    """
+    backends, tuples = connection.execute(
+        text(_WRITTEN_TUPLES_QUERY), {"name": name}
+    ).one()
+    return backends, tuples
+
+
+LOCK_TIMEOUT = "2s"
+"""How long resetting a database waits for locks held by other connections, before it gives up."""
+
+
+def install_write_tracking(connection: Connection) -> None:
+    """
+    Installs statement-level triggers on all tables of the database behind `connection` (usually the template), that
+    record which tables have been written to, so [`ResetPlan.apply()`][elefast.reset.ResetPlan.apply] only has to
+    reset those.
+
+    Calling it again only adds triggers to tables that don't have one yet, e.g. after new migrations were applied.
+    """
+    for statement in _TRACKING_STATEMENTS:
+        connection.execute(text(statement))
+
+
+@dataclass(frozen=True, slots=True, kw_only=True)
+class ResetPlan:
+    """
+    Everything we need to know about a template database in order to reset one of its clones.
+
+    It is computed once from the catalog of the migrated template and can then be applied to any number of clones.
+    """
+
+    tables: tuple[Table, ...]
+    """All tables of the template, sorted so that referenced tables come before the ones referencing them."""
+
+    rows: dict[str, list[dict[str, Any]]]
+    """The rows that already exist in the template (e.g. inserted by a migration), keyed by the table's full name."""
+
+    sequences: dict[str, int]
+    """The values of the sequences that were already used in the template, keyed by their quoted name."""
+
+    sequence_starts: dict[str, int] = field(default_factory=dict)
+    """The start values of the sequences that were not used in the template yet, keyed by their quoted name."""
+
+    tracked: bool = False
+    """Whether the template records which tables were written to, see `install_write_tracking()`."""
+
+    @classmethod
+    def from_template(cls, connection: Connection) -> ResetPlan:
+        """
+        Inspects the database behind `connection`, which should be the freshly migrated template.
+        """
+        metadata = MetaData()
+        schemas = inspect(connection).get_schema_names()
+        for schema in schemas:
+            if schema not in _SYSTEM_SCHEMAS and not schema.startswith("pg_temp"):
+                metadata.reflect(bind=connection, schema=schema)
+        tables = tuple(metadata.sorted_tables)
+
+        rows = {}
+        for table in tables:
+            existing = [
+                dict(row) for row in connection.execute(table.select()).mappings()
+            ]
+            if existing:
+                rows[table.fullname] = existing
+
+        sequences: dict[str, int] = {}
+        sequence_starts: dict[str, int] = {}
+        for name, value, start in connection.execute(
+            text(
+                "SELECT format('%I.%I', schemaname, sequencename), last_value, start_value "
+                "FROM pg_sequences"
+            )
+        ).tuples():
+            if value is None:
+                sequence_starts[name] = start
+            else:
+                sequences[name] = value
+        return cls(
+            tables=tables,
+            rows=rows,
+            sequences=sequences,
+            sequence_starts=sequence_starts,
+            tracked=TRACKING_SCHEMA in schemas,
+        )
+
+    def apply(self, connection: Connection) -> None:
+        """
+        Truncates the tables of the database behind `connection`, re-inserts the rows of the template and restores
+        its sequences.
+
+        If the template is `tracked`, only the tables that were written to are truncated, together with the tables
+        referencing them.
+        """
+        if not self.tables and not self.sequences and not self.sequence_starts:
+            return
+        # A connection that is still open might hold a lock on one of the tables, we'd rather fail than wait forever
+        connection.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+        tables = self.tables
+        if self.tracked:
+            written = {
+                f"{schema}.{name}"
+                for schema, name in connection.execute(
+                    text(_WRITTEN_TABLES_QUERY)
+                ).tuples()
+            }
+            tables = self._referencing(written)
+        if tables:
+            preparer = connection.dialect.identifier_preparer
+            names = ", ".join(preparer.format_table(table) for table in tables)
+            # Listing all tables in a single statement means we don't need to care about foreign keys
+            connection.execute(text(f"TRUNCATE {names} RESTART IDENTITY"))
+            for table in tables:
+                if rows := self.rows.get(table.fullname):
+                    _insert_rows(connection, table, rows)
+        self._restore_sequences(connection)
+        if self.tracked:
+            # The truncation and the inserts above marked the tables again
+            connection.execute(text(f"DELETE FROM {TRACKING_SCHEMA}.written_tables"))
+
+    def _referencing(self, names: set[str]) -> tuple[Table, ...]:
+        # Truncating a table requires truncating all tables with foreign keys to it as well
+        names = set(names)
+        changed = True
+        while changed:
+            changed = False
+            for table in self.tables:
+                if table.fullname not in names and any(
+                    key.column.table.fullname in names for key in table.foreign_keys
+                ):
+                    names.add(table.fullname)
+                    changed = True
+        return tuple(table for table in self.tables if table.fullname in names)
+
+    def _restore_sequences(self, connection: Connection) -> None:
+        calls: list[str] = []
+        parameters: dict[str, Any] = {}
+        for i, (name, value) in enumerate(self.sequences.items()):
+            calls.append(f"setval(CAST(:name_{i} AS regclass), :value_{i})")
+            parameters[f"name_{i}"] = name
+            parameters[f"value_{i}"] = value
+        # RESTART IDENTITY misses sequences that no truncated table owns, e.g. standalone ones or those of tables
+        # that were not written to, so they are always set back to their start
+        offset = len(self.sequences)
+        for i, (name, start) in enumerate(self.sequence_starts.items(), offset):
+            calls.append(f"setval(CAST(:name_{i} AS regclass), :value_{i}, false)")
+            parameters[f"name_{i}"] = name
+            parameters[f"value_{i}"] = start
+        if calls:
+            connection.execute(text(f"SELECT {', '.join(calls)}"), parameters)
+
+
+def _insert_rows(
+    connection: Connection, table: Table, rows: list[dict[str, Any]]
+) -> None:
+    # Generated columns can't be written at all, and identity columns declared as GENERATED ALWAYS only with
+    # OVERRIDING SYSTEM VALUE, which SQLAlchemy's insert() does not support
+    columns = [column for column in table.columns if column.computed is None]
+    preparer = connection.dialect.identifier_preparer
+    names = ", ".join(preparer.format_column(column) for column in columns)
+    values = ", ".join(f":value_{i}" for i in range(len(columns)))
+    statement = text(
+        f"INSERT INTO {preparer.format_table(table)} ({names}) OVERRIDING SYSTEM VALUE VALUES ({values})"
+    ).bindparams(
+        *(
+            bindparam(f"value_{i}", type_=column.type)
+            for i, column in enumerate(columns)
+        )
+    )
+    parameters = [
+        {f"value_{i}": row[column.name] for i, column in enumerate(columns)}
+        for row in rows
+    ]
+    connection.execute(statement, parameters)
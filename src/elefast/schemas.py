@@ -0,0 +1,75 @@
+"""
+Utilities for isolating tests using schemas inside a shared database, instead of separate databases.
+"""
+
+from __future__ import annotations
+
+import re
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+from sqlalchemy import Connection, Engine, event
+
+RecordedStatement = tuple[str, Any]
+"""A statement sent to the database, together with its (driver-level) parameters."""
+
+_CATALOG_QUERY = re.compile(
+    r"\s*(SHOW\b|SELECT\b.*\bFROM\s+(pg_catalog\.|information_schema\.|pg_))",
+    re.IGNORECASE | re.DOTALL,
+)
+"""Matches lookups in the system catalogs, e.g. a migrator checking which tables exist."""
+
+
+def search_path(schema: str) -> str:
+    """
+    The `search_path` that makes `schema` the default for new tables, while keeping extensions in `public` usable.
+    """
+    return f'"{schema}", public'
+
+
+def pin_search_path(engine: Engine, schema: str) -> None:
+    """
+    Makes all connections of `engine` use `schema` by default.
+    """
+
+    @event.listens_for(engine, "connect")
+    def set_search_path(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"SET search_path TO {search_path(schema)}")
+        cursor.close()
+        # Committed right away, so that the setting holds for the whole session and no rollback can revert it
+        dbapi_connection.commit()
+
+
+@contextmanager
+def record_statements(connection: Connection) -> Iterator[list[RecordedStatement]]:
+    """
+    Collects the statements executed on `connection` while the context manager is active.
+
+    Catalog lookups, e.g. a migrator checking which tables exist, are left out, because replaying them would only
+    cost time. Other queries are kept, as they might change something, e.g. `SELECT setval(...)`.
+    """
+    statements: list[RecordedStatement] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not _CATALOG_QUERY.match(statement):
+            statements.append((statement, parameters))
+
+    event.listen(connection, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(connection, "before_cursor_execute", record)
+
+
+def replay_statements(
+    connection: Connection, schema: str, statements: list[RecordedStatement]
+) -> None:
+    """
+    Creates `schema` and executes the `statements` recorded for the template schema in it.
+    """
+    connection.exec_driver_sql(f'CREATE SCHEMA "{schema}"')
+    connection.exec_driver_sql(f"SET LOCAL search_path TO {search_path(schema)}")
+    for statement, parameters in statements:
+        connection.exec_driver_sql(statement, parameters or None)
@@ -1,19 +1,65 @@
 from __future__ import annotations
 
+import threading
 import time
-from collections.abc import Callable
-from contextlib import AbstractContextManager
-from typing import Protocol, Self, TypeAlias
+from collections.abc import Callable, Iterator, Mapping
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AbstractContextManager, contextmanager
+from functools import partial
+from itertools import count
+from queue import Empty, Queue
+from types import MappingProxyType
+from typing import Any, Literal, Protocol, Self, TypeAlias
 from uuid import uuid4
 
-from sqlalchemy import URL, Connection, Engine, MetaData, NullPool, create_engine, text
+from sqlalchemy import (
+    URL,
+    Connection,
+    Engine,
+    MetaData,
+    NullPool,
+    RootTransaction,
+    create_engine,
+    text,
+)
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import Session, sessionmaker
-from sqlalchemy.schema import CreateSchema
 
+from elefast.cloning import CloneStrategy, TemplateClone, template_in_use
+from elefast.engines import derive_engine
 from elefast.errors import DatabaseNotReadyError
+from elefast.reset import ResetPlan, install_write_tracking, written_tuples
+from elefast.schemas import (
+    RecordedStatement,
+    pin_search_path,
+    record_statements,
+    replay_statements,
+    search_path,
+)
+from elefast.templates import (
+    CANDIDATES_QUERY,
+    Fingerprinted,
+    Upgradable,
+    lock_key,
+    metadata_fingerprint,
+    migrate_metadata,
+    revision_comment_statement,
+    template_name,
+    upgradable_template,
+    xdist_template_name,
+    xdist_worker_index,
+)
 
 CanBeTurnedIntoEngine: TypeAlias = "Engine | URL | str"
 
+_TRANSACTIONAL_SESSIONMAKER = partial(
+    sessionmaker, join_transaction_mode="create_savepoint"
+)
+"""Creates sessions that join the outer transaction of a `TransactionalDatabase` via savepoints."""
+
+_DEFAULT_STRATEGY: CloneStrategy = TemplateClone()
+"""The clone strategy used unless one is passed explicitly. It is stateless, so sharing it is safe."""
+
 
 class Migrator(Protocol):
     """
@@ -31,22 +77,32 @@ class MetadataMigrator(Migrator):
     Creates the database schema based on `sqlalchemy.MetaData`.
     """
 
-    def __init__(self, metadata: MetaData) -> None:
+    def __init__(self, metadata: MetaData, drop_existing: bool = False) -> None:
+        """
+        Params:
+            metadata: the tables to create.
+            drop_existing: drop the tables first, for databases that are not empty. Elefast only migrates fresh
+                databases, so this is only needed when you call `migrate()` yourself.
+        """
         self._metadata = metadata
+        self._drop_existing = drop_existing
+        self._scripts: dict[str, list[str]] = {}
 
     def migrate(self, connection: Connection) -> None:
         """
-        Drops and creates all tables specified in the `metadata` object passed via the constructor.
+        Creates all tables specified in the `metadata` object passed via the constructor in the empty database.
+
+        The statements are compiled once and sent to the database in a single batch where the driver allows it.
         """
-        schemas = {
-            table.schema
-            for table in self._metadata.tables.values()
-            if table.schema is not None and table.schema != "public"
-        }
-        for schema in schemas:
-            connection.execute(CreateSchema(schema, if_not_exists=True))
-        self._metadata.drop_all(bind=connection)
-        self._metadata.create_all(bind=connection)
+        migrate_metadata(
+            connection, self._metadata, self._scripts, drop_existing=self._drop_existing
+        )
+
+    def fingerprint(self) -> str:
+        """
+        A hash of the DDL generated for the `metadata`, so templates can be reused while it does not change.
+        """
+        return metadata_fingerprint(self._metadata)
 
 
 class Database(AbstractContextManager):
@@ -102,6 +158,45 @@ class Database(AbstractContextManager):
         self.engine.dispose()
         self.server.drop_database(self.name)
 
+    def snapshot(self) -> str:
+        """
+        Turns the current state of the database into a new template and returns its name.
+
+        Pass it as `from_snapshot` to [`DatabaseServer.create_database()`][DatabaseServer.create_database] to get a
+        fresh copy, e.g. to run an expensive data setup only once per module instead of before every test. The
+        connections of the engine are closed beforehand, make sure to close your sessions as well.
+        """
+        self.engine.dispose()
+        return self.server.snapshot_database(self.name)
+
+    def reset(self) -> None:
+        """
+        Returns the database to the state of the template, without dropping and re-creating it.
+
+        All tables are truncated, rows that already existed in the template are inserted again and sequences are
+        restarted. This is much cheaper than a new database when your tests only write a handful of rows. Make sure to
+        close your sessions and connections beforehand, as they might hold locks that block the truncation. The reset
+        fails if such a lock is not released within two seconds.
+
+        With `track_writes=True` on the server, only the tables that were written to are truncated.
+        """
+        with self.engine.begin() as connection:
+            self.server.reset_plan().apply(connection)
+
+    def transactional(
+        self,
+        sessionmaker_factory: Callable[
+            [Connection], Callable[[], Session]
+        ] = _TRANSACTIONAL_SESSIONMAKER,
+    ) -> TransactionalDatabase:
+        """
+        Opens a connection whose changes are rolled back once you are done with it.
+
+        This allows sharing a single database between many tests, see
+        [`TransactionalDatabase`][TransactionalDatabase].
+        """
+        return TransactionalDatabase(self, sessionmaker_factory=sessionmaker_factory)
+
     def session(self) -> Session:
         """
         Creates a new ORM session.
@@ -111,16 +206,231 @@ class Database(AbstractContextManager):
         return self.sessionmaker()
 
 
+class TransactionalDatabase(AbstractContextManager):
+    """
+    A connection to a [`Database`][Database] that runs everything in a transaction, which is rolled back on exit.
+
+    Rolling back a transaction is a lot cheaper than creating and dropping a database, so you can create one database
+    for all of your tests and isolate them using this class instead. Sessions created using
+    [`session()`][TransactionalDatabase.session] join the outer transaction, and calls to `Session.commit()` only
+    release a savepoint instead of actually committing.
+    """
+
+    connection: Connection
+    """The connection holding the outer transaction. Use `begin_nested()` instead of `commit()` on it."""
+
+    def __init__(
+        self,
+        database: Database,
+        sessionmaker_factory: Callable[
+            [Connection], Callable[[], Session]
+        ] = _TRANSACTIONAL_SESSIONMAKER,
+    ) -> None:
+        """
+        Note that this is usually obtained from [`Database.transactional()`][Database.transactional].
+
+        Params:
+            database: the database to connect to.
+            sessionmaker_factory: allows you to set custom options for the [`session()`][TransactionalDatabase.session]
+                utility. Make sure to keep `join_transaction_mode="create_savepoint"` if you customize it.
+        """
+        self.database = database
+        self._sessionmaker_factory = sessionmaker_factory
+        self._transaction: RootTransaction | None = None
+
+    def __enter__(self) -> Self:
+        self.connection = self.database.engine.connect()
+        self._transaction = self.connection.begin()
+        self.sessionmaker = self._sessionmaker_factory(self.connection)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.rollback()
+
+    @property
+    def url(self) -> URL:
+        """
+        The URL of the underlying database.
+        """
+        return self.database.url
+
+    @property
+    def name(self) -> str:
+        """
+        The name of the underlying database.
+        """
+        return self.database.name
+
+    def rollback(self) -> None:
+        """
+        Rolls back everything that happened since entering the context manager and closes the connection.
+        """
+        if self._transaction is None:
+            return
+        if self._transaction.is_active:
+            self._transaction.rollback()
+        self.connection.close()
+        self._transaction = None
+
+    def session(self) -> Session:
+        """
+        Creates a new ORM session that is bound to the outer transaction.
+        """
+        return self.sessionmaker()
+
+
+class DatabaseSchema(Database):
+    """
+    A schema inside a database that is shared with other tests.
+
+    It is returned by [`DatabaseServer.create_database()`][DatabaseServer.create_database] when using
+    `isolation="schema"`. All connections of its `engine` use the schema by default, so you can use it just like a
+    regular [`Database`][Database].
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        server: DatabaseServer,
+        schema: str,
+        sessionmaker_factory: Callable[[Engine], Callable[[], Session]] = sessionmaker,
+    ) -> None:
+        super().__init__(engine, server, sessionmaker_factory)
+        self.schema = schema
+
+    def drop(self) -> None:
+        """
+        Disposes the engine and drops the schema.
+        """
+        self.engine.dispose()
+        self.server.drop_schema(self.schema)
+
+
+class ReadOnlyDatabase(Database):
+    """
+    A database that is shared by all tests that only read from it.
+
+    It is returned by [`DatabaseServer.create_read_only_database()`][DatabaseServer.create_read_only_database]. All
+    transactions are read-only by default, so accidental writes fail instead of leaking into other tests.
+    """
+
+    def drop(self) -> None:
+        """
+        Disposes the engine. The database itself is shared and only dropped when the server is closed.
+        """
+        self.engine.dispose()
+
+
 class DatabaseServer:
     def __init__(
         self,
         engine: CanBeTurnedIntoEngine,
         schema: Migrator | None = None,
         debug=False,
+        pool_size: int = 0,
+        background_drops: bool = False,
+        max_pending_drops: int = 32,
+        recycle_databases: bool = False,
+        clone_strategy: CloneStrategy = _DEFAULT_STRATEGY,
+        isolation: Literal["database", "schema"] = "database",
+        persistent_template: bool = False,
+        template_replicas: int = 1,
+        native_driver: bool = False,
+        engine_options: Mapping[str, Any] | None = None,
+        warm_up: bool = False,
+        track_writes: bool = False,
+        reuse_untouched: bool = False,
     ) -> None:
+        """
+        Params:
+            engine: an engine, URL or connection string pointing to the Postgres server.
+            schema: creates the schema of the template database, that all others are cloned from.
+            pool_size: how many spare databases to keep around. They are cloned from the template in a background
+                thread, so [`create_database()`][DatabaseServer.create_database] can hand them out immediately.
+                Disabled by default.
+            background_drops: instead of dropping databases right away, [`drop_database()`][DatabaseServer.drop_database]
+                queues them up for a background thread that drops them in batches.
+            max_pending_drops: how many databases may wait for being dropped in the background, before
+                [`drop_database()`][DatabaseServer.drop_database] blocks.
+            recycle_databases: instead of dropping databases, [`drop_database()`][DatabaseServer.drop_database] resets
+                them to the state of the template and keeps them around for the next call to
+                [`create_database()`][DatabaseServer.create_database].
+            clone_strategy: how databases are cloned from the template, see [`CloneStrategy`][CloneStrategy].
+            isolation: use `"schema"` to create a schema inside a single shared database for each call to
+                [`create_database()`][DatabaseServer.create_database], instead of a whole database.
+            persistent_template: name the template database after a fingerprint of the schema and reuse it in
+                future test sessions, as long as the schema does not change. Requires a migrator implementing
+                `fingerprint()`, like the built-in ones.
+            template_replicas: how many copies of the template to clone from, in turns. Postgres can not clone a
+                template while another session is cloning it, so more replicas let more clones run concurrently.
+            native_driver: send `CREATE DATABASE` and `DROP DATABASE` directly through the connection of the driver
+                (psycopg and psycopg2, or asyncpg for async), instead of going through SQLAlchemy's transaction
+                handling. Other drivers always use SQLAlchemy.
+            engine_options: keyword arguments for `create_engine()` when creating the engines of the databases.
+                Defaults to a small pool, so that many databases existing at the same time don't exhaust
+                `max_connections`.
+            warm_up: open the first connection of each new database right away, so the first query of a test does not
+                have to wait for it. Databases from the pool are warmed up in the background.
+            track_writes: install triggers in the template that record which tables a test writes to, so resetting a
+                database only truncates those. See [`Database.reset()`][Database.reset].
+            reuse_untouched: keep databases that were not written to when they are dropped, and hand them out again
+                instead of cloning the template. Requires Postgres 15 or newer, databases are always dropped otherwise.
+        """
+        if (
+            persistent_template
+            and schema is not None
+            and not isinstance(schema, Fingerprinted)
+        ):
+            raise ValueError(
+                f"persistent_template requires a migrator with a fingerprint() method, but {type(schema).__name__} has none."
+            )
+        if template_replicas < 1:
+            raise ValueError(
+                f"template_replicas must be at least 1, but was {template_replicas}."
+            )
         self._migrator = schema
         self._engine = _build_engine(engine)
+        self._owns_engine = self._engine is not engine
         self._template_db_name: str | None = None
+        self._build_lock = threading.Lock()
+        self._template_replica_count = template_replicas
+        self._template_replicas: list[str] = []
+        # Under xdist, workers start their turns at different replicas instead of all at the shared template
+        self._clones = count(xdist_worker_index())
+        self._native_driver = native_driver
+        self._engine_options = dict(
+            _ENGINE_OPTIONS if engine_options is None else engine_options
+        )
+        self._warm_up = warm_up
+        self._track_writes = track_writes
+        self._reuse_untouched = reuse_untouched
+        self._baselines: dict[str, int] = {}
+        self._read_only_databases: dict[str, str] = {}
+        self._snapshots: dict[str, str] = {}
+        self._derived_templates: dict[str, str] = {}
+        self._prototype: Engine | None = None
+        self._pool = (
+            _DatabasePool(size=pool_size, create=self._create_pooled_database)
+            if pool_size > 0
+            else None
+        )
+        self._dropper = (
+            _BackgroundDropper(drop=self._drop_databases, max_pending=max_pending_drops)
+            if background_drops
+            else None
+        )
+        self._clone_strategy = clone_strategy
+        self._recycle_databases = recycle_databases
+        self._recyclable: dict[str, tuple[str, str]] = {}
+        self._recycled: dict[tuple[str, str], list[str]] = {}
+        self._reset_plan: ResetPlan | None = None
+        self._reset_plan_lock = threading.Lock()
+        self._isolation = isolation
+        self._persistent_template = persistent_template
+        self._shared_engine: Engine | None = None
+        self._schema_statements: list[RecordedStatement] = []
+        self._preparation_error: Exception | None = None
+        self._preparation: threading.Thread | None = None
 
     @property
     def url(self) -> URL:
@@ -145,41 +455,763 @@ class DatabaseServer:
                     ) from error
                 time.sleep(interval)
 
+    def prepare(self, encoding: str = "utf8") -> Self:
+        """
+        Starts building the template in a background thread and returns immediately.
+
+        [`create_database()`][DatabaseServer.create_database] only waits for the build if it has not finished yet,
+        so the migrations can run while pytest collects your tests and sets up other fixtures.
+        """
+        if self._preparation is None:
+            self._preparation = threading.Thread(
+                target=self._prepare,
+                args=(encoding,),
+                name="elefast-prepare",
+                daemon=True,
+            )
+            self._preparation.start()
+        return self
+
     def create_database(
         self,
         prefix: str = "elefast",
-        encoding: str = "utf8",
+        encoding: str | None = None,
+        from_snapshot: str | None = None,
     ) -> Database:
-        template_db = self._template_db_name
-        if template_db is None:
-            engine = _prepare_database(
-                self._engine, encoding=encoding, prefix="elefast-template-db"
+        if self._isolation == "schema":
+            return self._create_schema(prefix)
+        if from_snapshot is not None:
+            engine = self._clone_template(
+                prefix,
+                self._snapshot_encoding(from_snapshot, encoding),
+                template=from_snapshot,
+            )
+            return Database(engine=engine, server=self)
+
+        if encoding is None:
+            encoding = "utf8"
+        self._ensure_template(encoding)
+
+        options = (prefix, encoding)
+        if recycled := self._take_recycled_database(options):
+            assert self._prototype is not None
+            engine = derive_engine(self._prototype, recycled)
+            if self._warm_up:
+                _warm_up(engine)
+        elif self._pool is not None and options == _POOLED_DATABASE_OPTIONS:
+            engine = self._pool.take()
+        else:
+            engine = self._clone_template(prefix, encoding)
+        if self._recycle_databases or self._reuse_untouched:
+            assert engine.url.database
+            self._recyclable[engine.url.database] = options
+            if self._reuse_untouched:
+                self._record_baseline(engine.url.database)
+        return Database(engine=engine, server=self)
+
+    def create_databases(
+        self,
+        n: int,
+        prefix: str = "elefast",
+        encoding: str = "utf8",
+        concurrency: int = 4,
+    ) -> list[Database]:
+        """
+        Creates `n` databases at once, cloning up to `concurrency` of them at the same time in a thread pool.
+
+        If any of them can not be created, the others are dropped again and all errors are raised together.
+        """
+        if n == 0:
+            return []
+        with ThreadPoolExecutor(
+            max_workers=min(n, concurrency), thread_name_prefix="elefast-create"
+        ) as executor:
+            futures = [
+                executor.submit(self.create_database, prefix=prefix, encoding=encoding)
+                for _ in range(n)
+            ]
+        databases: list[Database] = []
+        errors: list[Exception] = []
+        for future in futures:
+            try:
+                databases.append(future.result())
+            except Exception as error:  # noqa: BLE001 - raised below
+                errors.append(error)
+        if errors:
+            for database in databases:
+                database.drop()
+            raise ExceptionGroup("Could not create all databases", errors)
+        return databases
+
+    def create_read_only_database(self, encoding: str = "utf8") -> ReadOnlyDatabase:
+        """
+        Hands out a database that is shared by all callers and rejects writes, so tests that only read don't have to
+        wait for the template to be cloned.
+
+        The database is cloned once, the first time it is requested, and configured with
+        `default_transaction_read_only`. Dropping the returned [`ReadOnlyDatabase`][ReadOnlyDatabase] only disposes its
+        engine, the database itself is dropped by [`close()`][DatabaseServer.close].
+        """
+        name = self._read_only_databases.get(encoding)
+        if name is None:
+            self._ensure_template(encoding)
+            with self._build_lock:
+                name = self._read_only_databases.get(encoding)
+                if name is None:
+                    name = self._create_read_only_database(encoding)
+                    self._read_only_databases[encoding] = name
+        assert self._prototype is not None
+        engine = derive_engine(self._prototype, name)
+        return ReadOnlyDatabase(engine=engine, server=self)
+
+    def derive_template(
+        self,
+        key: str,
+        seed: Callable[[Connection], None],
+        parent: str | None = None,
+        encoding: str = "utf8",
+    ) -> str:
+        """
+        Builds a template by running `seed` on a clone of the template derived under the `parent` key, or of the
+        template created by the migrator, and caches it under `key`.
+
+        The returned name can be passed as `from_snapshot` to [`create_database()`][DatabaseServer.create_database],
+        so tests start from the seeded state without running `seed` again. Calling it again with the same `key` returns
+        the cached template, e.g. from a module- or class-scoped fixture. Derived templates are dropped by
+        [`close()`][DatabaseServer.close].
+        """
+        if self._isolation == "schema":
+            raise ValueError(
+                'Derived templates are not supported with isolation="schema".'
+            )
+        if (name := self._derived_templates.get(key)) is not None:
+            return name
+        self._ensure_template(encoding)
+        with self._build_lock:
+            if (name := self._derived_templates.get(key)) is None:
+                name = self._build_derived_template(seed, parent, encoding)
+                self._derived_templates[key] = name
+        return name
+
+    def snapshot_database(self, name: str) -> str:
+        """
+        Creates a copy of the database called `name`, that can be cloned like a template by passing the returned name
+        as `from_snapshot` to [`create_database()`][DatabaseServer.create_database].
+
+        Nobody may be connected to the database while it is copied. Snapshots are dropped by
+        [`close()`][DatabaseServer.close].
+        """
+        if self._isolation == "schema":
+            raise ValueError('Snapshots are not supported with isolation="schema".')
+        with self._engine.connect() as connection:
+            result = connection.execute(text(_ENCODING_QUERY), {"name": name})
+            encoding = result.scalar_one()
+        engine = self._clone("elefast-snapshot", encoding, template=name)
+        # Nobody may be connected to a database while it is cloned
+        engine.dispose()
+        snapshot = engine.url.database
+        assert snapshot
+        self._snapshots[snapshot] = encoding
+        return snapshot
+
+    def drop_database(self, name: str) -> None:
+        if (options := self._recyclable.pop(name, None)) is not None:
+            if self._is_untouched(name):
+                self._recycled.setdefault(options, []).append(name)
+                return
+            if self._recycle_databases:
+                try:
+                    self._reset_database(name)
+                except DBAPIError:
+                    pass  # We could not reset it, so we drop it like any other database
+                else:
+                    self._recycled.setdefault(options, []).append(name)
+                    return
+        if self._dropper is not None:
+            self._dropper.submit(name)
+        else:
+            self._drop_databases([name])
+
+    def drop_schema(self, name: str) -> None:
+        """
+        Drops a schema created when using `isolation="schema"`, together with everything inside it.
+        """
+        assert self._shared_engine is not None
+        with self._shared_engine.begin() as connection:
+            connection.exec_driver_sql(f'DROP SCHEMA "{name}" CASCADE')
+
+    def close(self) -> None:
+        """
+        Stops background work, drops the spare databases of the pool and waits for pending drops.
+
+        Call this at the end of your test session, e.g. after `yield`ing the server from a session-scoped fixture.
+        """
+        if self._preparation is not None:
+            self._preparation.join()
+            self._preparation = None
+        if self._pool is not None:
+            for engine in self._pool.close():
+                engine.dispose()
+                assert engine.url.database
+                self.drop_database(engine.url.database)
+        recycled, self._recycled = self._recycled, {}
+        for names in recycled.values():
+            for name in names:
+                self.drop_database(name)
+        if self._shared_engine is not None:
+            self._shared_engine.dispose()
+            assert self._shared_engine.url.database
+            self.drop_database(self._shared_engine.url.database)
+            self._shared_engine = None
+        self._derived_templates = {}
+        snapshots, self._snapshots = self._snapshots, {}
+        for name in snapshots:
+            self.drop_database(name)
+        read_only, self._read_only_databases = self._read_only_databases, {}
+        for name in read_only.values():
+            self.drop_database(name)
+        replicas, self._template_replicas = self._template_replicas, []
+        for name in replicas:
+            self.drop_database(name)
+        if self._dropper is not None:
+            self._dropper.close()
+        if self._owns_engine:
+            self._engine.dispose()
+
+    def reset_plan(self) -> ResetPlan:
+        """
+        Describes how to return a database to the state of the template, see [`Database.reset()`][Database.reset].
+
+        It is computed from the template the first time it is needed.
+        """
+        if (plan := self._reset_plan) is not None:
+            return plan
+        template = self._template_db_name
+        assert template, "The template database has not been created yet"
+        return self._load_reset_plan(template)
+
+    def _load_reset_plan(self, template: str) -> ResetPlan:
+        # Concurrent callers wait for the first one to inspect the template, instead of inspecting it themselves
+        with self._reset_plan_lock:
+            if self._reset_plan is None:
+                engine = create_engine(
+                    self._engine.url.set(database=template), poolclass=NullPool
+                )
+                with engine.connect() as connection:
+                    self._reset_plan = ResetPlan.from_template(connection)
+                engine.dispose()
+            return self._reset_plan
+
+    def _prepare(self, encoding: str) -> None:
+        try:
+            if self._isolation == "schema":
+                self._ensure_schema_template()
+            else:
+                self._ensure_template(encoding)
+        except Exception as error:  # noqa: BLE001 - raised by create_database()
+            # Instead of getting lost in the background
+            self._preparation_error = error
+
+    def _raise_preparation_error(self) -> None:
+        # Raised only once, so that later calls build the template again
+        if (error := self._preparation_error) is not None:
+            self._preparation_error = None
+            raise error
+
+    def _ensure_template(self, encoding: str) -> str:
+        if (template_db := self._template_db_name) is not None:
+            return template_db
+        # Concurrent callers wait for the first one to build the template, instead of building their own
+        with self._build_lock:
+            template_db = self._template_db_name
+            if template_db is None:
+                self._raise_preparation_error()
+                shared_name = self._shared_template_name(encoding)
+                if shared_name is None:
+                    template_db = self._build_template(encoding)
+                else:
+                    with self._template_lock(shared_name):
+                        template_db = self._ensure_shared_template(
+                            shared_name, encoding
+                        )
+                self._create_template_replicas(template_db, encoding)
+                # Only publish the template once everything that is derived from it is ready
+                if self._recycle_databases:
+                    self._load_reset_plan(template_db)
+                self._template_db_name = template_db
+        return template_db
+
+    def _ensure_shared_template(self, name: str, encoding: str) -> str:
+        if self._database_exists(name):
+            # Another process built the template. This engine never connects, so it does not block cloning.
+            self._prototype = create_engine(
+                self._engine.url.set(database=name), **self._engine_options
             )
+            return name
+        base = (
+            self._upgradable_template(encoding) if self._persistent_template else None
+        )
+        template_db = self._build_template(encoding, base)
+        return self._persist_template(template_db, name)
+
+    @contextmanager
+    def _template_lock(self, name: str) -> Iterator[None]:
+        # Makes sure only one process builds the template, while the others wait and reuse it
+        key = {"key": lock_key(name)}
+        with self._engine.connect() as connection:
+            connection.execute(text("SELECT pg_advisory_lock(:key)"), key)
+            try:
+                yield
+            finally:
+                connection.execute(text("SELECT pg_advisory_unlock(:key)"), key)
+
+    def _build_template(self, encoding: str, base: str | None = None) -> str:
+        engine = _prepare_database(
+            self._engine,
+            native=self._native_driver,
+            encoding=encoding,
+            prefix="elefast-template-db",
+            template=base,
+            strategy=self._clone_strategy,
+            options=self._engine_options,
+        )
+        template_db = engine.url.database
+        assert isinstance(template_db, str)
+        try:
             if self._migrator:
                 with engine.begin() as connection:
                     self._migrator.migrate(connection)
                     connection.commit()
+            if self._track_writes:
+                with engine.begin() as connection:
+                    install_write_tracking(connection)
+            if self._recycle_databases:
+                # Computing this later would require connecting to the template, which blocks cloning it
+                with engine.connect() as connection:
+                    self._reset_plan = ResetPlan.from_template(connection)
+        except Exception:
+            # Do not leak a half-migrated template, nothing would ever drop it
             engine.dispose()
-            template_db = engine.url.database
-            assert isinstance(template_db, str)
-            self._template_db_name = template_db
+            self._drop_databases([template_db])
+            raise
+        engine.dispose()
+        # Clones get engines derived from this one, sharing its dialect and compiled statement cache
+        self._prototype = engine
+        return template_db
 
-        engine = _prepare_database(
-            self._engine, encoding=encoding, prefix=prefix, template=template_db
-        )
-        return Database(engine=engine, server=self)
+    def _shared_template_name(self, encoding: str) -> str | None:
+        if self._migrator is None:
+            fingerprint = ""
+        elif isinstance(self._migrator, Fingerprinted):
+            fingerprint = self._migrator.fingerprint()
+        else:
+            return None
+        if self._track_writes:
+            # Templates with triggers must not be mixed up with the ones without
+            fingerprint += ":tracked"
+        if self._persistent_template:
+            return template_name(fingerprint, encoding)
+        return xdist_template_name(fingerprint, encoding)
 
-    def drop_database(self, name: str) -> None:
+    def _persist_template(self, template_db: str, name: str) -> str:
+        try:
+            with self._engine.begin() as connection:
+                statement = f'ALTER DATABASE "{template_db}" RENAME TO "{name}"'
+                connection.execute(text(statement))
+        except DBAPIError:
+            if not self._database_exists(name):
+                raise
+            # Another test session persisted the same schema in the meantime
+            self._drop_databases([template_db])
+            return name
+        if isinstance(self._migrator, Upgradable):
+            statement = revision_comment_statement(name, self._migrator.revision())
+            try:
+                with self._engine.begin() as connection:
+                    connection.execute(text(statement))
+            except DBAPIError:
+                # Without its revision, later sessions could not upgrade the template, so build it again next time
+                self._drop_databases([name])
+                raise
+        return name
+
+    def _upgradable_template(self, encoding: str) -> str | None:
+        if not isinstance(self._migrator, Upgradable):
+            return None
+        with self._engine.connect() as connection:
+            candidates = connection.execute(text(CANDIDATES_QUERY)).tuples().all()
+        return upgradable_template(self._migrator, encoding, candidates)
+
+    def _database_exists(self, name: str) -> bool:
+        with self._engine.connect() as connection:
+            result = connection.execute(
+                text("SELECT 1 FROM pg_database WHERE datname = :name"),
+                {"name": name},
+            )
+            return result.first() is not None
+
+    def _create_schema(self, prefix: str) -> DatabaseSchema:
+        shared_engine = self._ensure_schema_template()
+        schema = f"{prefix}_{uuid4().hex}"
+        with shared_engine.begin() as connection:
+            replay_statements(connection, schema, self._schema_statements)
+        assert shared_engine.url.database
+        engine = derive_engine(shared_engine, shared_engine.url.database)
+        pin_search_path(engine, schema)
+        return DatabaseSchema(engine=engine, server=self, schema=schema)
+
+    def _ensure_schema_template(self) -> Engine:
+        if self._shared_engine is not None:
+            return self._shared_engine
+        with self._build_lock:
+            if self._shared_engine is None:
+                self._raise_preparation_error()
+                engine = _prepare_database(
+                    self._engine,
+                    native=self._native_driver,
+                    prefix="elefast-shared-db",
+                    options=self._engine_options,
+                )
+                try:
+                    with engine.begin() as connection:
+                        connection.exec_driver_sql(
+                            f'CREATE SCHEMA "{_TEMPLATE_SCHEMA}"'
+                        )
+                        connection.exec_driver_sql(
+                            f"SET LOCAL search_path TO {search_path(_TEMPLATE_SCHEMA)}"
+                        )
+                        # Instead of running the migrator again for each schema, we replay what it did
+                        with record_statements(connection) as statements:
+                            if self._migrator:
+                                self._migrator.migrate(connection)
+                except Exception:
+                    engine.dispose()
+                    assert engine.url.database
+                    self._drop_databases([engine.url.database])
+                    raise
+                self._schema_statements = statements
+                self._shared_engine = engine
+            return self._shared_engine
+
+    def _snapshot_encoding(self, snapshot: str, encoding: str | None) -> str:
+        if (snapshot_encoding := self._snapshots.get(snapshot)) is None:
+            raise ValueError(f"There is no snapshot called {snapshot!r}.")
+        if encoding is not None and _encoding_key(encoding) != _encoding_key(
+            snapshot_encoding
+        ):
+            raise ValueError(
+                f"The snapshot {snapshot!r} uses the encoding {snapshot_encoding!r}, not {encoding!r}."
+            )
+        return snapshot_encoding
+
+    def _take_recycled_database(self, options: tuple[str, str]) -> str | None:
+        try:
+            return self._recycled.get(options, []).pop()
+        except IndexError:
+            return None
+
+    def _build_derived_template(
+        self, seed: Callable[[Connection], None], parent: str | None, encoding: str
+    ) -> str:
+        template = None
+        if parent is not None:
+            if parent not in self._derived_templates:
+                raise ValueError(f"There is no derived template for {parent!r}.")
+            template = self._derived_templates[parent]
+        engine = self._clone("elefast-template-db", encoding, template=template)
+        name = engine.url.database
+        assert name
+        try:
+            with engine.begin() as connection:
+                seed(connection)
+        except Exception:
+            engine.dispose()
+            self._drop_databases([name])
+            raise
+        # Nobody may be connected to a database while it is cloned
+        engine.dispose()
+        self._snapshots[name] = encoding
+        return name
+
+    def _create_read_only_database(self, encoding: str) -> str:
+        engine = self._clone_template("elefast-read-only", encoding)
+        # The setting only applies to new connections, so we must not keep the ones opened so far
+        engine.dispose()
+        name = engine.url.database
+        assert name
         with self._engine.begin() as connection:
-            statement = f'DROP DATABASE "{name}"'
+            statement = (
+                f'ALTER DATABASE "{name}" SET default_transaction_read_only = on'
+            )
             connection.execute(text(statement))
+        return name
+
+    def _record_baseline(self, name: str) -> None:
+        if (self._engine.dialect.server_version_info or (0,)) < (15,):
+            return  # Older servers report statistics asynchronously, so we can't tell whether a database is untouched
+        with self._engine.connect() as connection:
+            _, self._baselines[name] = written_tuples(connection, name)
+
+    def _is_untouched(self, name: str) -> bool:
+        if (baseline := self._baselines.pop(name, None)) is None:
+            return False
+        with self._engine.connect() as connection:
+            for _ in range(_UNTOUCHED_POLLS):
+                backends, tuples = written_tuples(connection, name)
+                if backends == 0:
+                    return tuples == baseline
+                time.sleep(_UNTOUCHED_POLL_INTERVAL)
+        return False
+
+    def _reset_database(self, name: str) -> None:
+        engine = create_engine(self._engine.url.set(database=name), poolclass=NullPool)
+        try:
+            with engine.begin() as connection:
+                self.reset_plan().apply(connection)
+        finally:
+            engine.dispose()
+
+    def _drop_databases(self, names: list[str]) -> None:
+        # Each database is dropped on its own, so one that is still in use does not keep the others around
+        errors: list[Exception] = []
+        for name in names:
+            try:
+                _execute_admin_statements(
+                    self._engine, [f'DROP DATABASE "{name}"'], self._native_driver
+                )
+            except Exception as error:  # noqa: BLE001 - raised below
+                errors.append(error)
+        if len(names) == 1 and errors:
+            raise errors[0]
+        if errors:
+            raise ExceptionGroup("Could not drop all databases", errors)
+
+    def _create_pooled_database(self) -> Engine:
+        return self._clone_template(*_POOLED_DATABASE_OPTIONS)
+
+    def _clone_template(
+        self, prefix: str, encoding: str, template: str | None = None
+    ) -> Engine:
+        engine = self._clone(prefix, encoding, template)
+        if self._warm_up:
+            _warm_up(engine)
+        return engine
+
+    def _clone(self, prefix: str, encoding: str, template: str | None = None) -> Engine:
+        # Clones the given database, or the template (and its replicas) by default
+        attempts = 0
+        while True:
+            try:
+                engine = _prepare_database(
+                    self._engine,
+                    native=self._native_driver,
+                    prefix=prefix,
+                    encoding=encoding,
+                    template=template or self._next_template(),
+                    strategy=self._clone_strategy,
+                    prototype=self._prototype,
+                    options=self._engine_options,
+                )
+            except DBAPIError as error:
+                attempts += 1
+                if attempts >= _CLONE_ATTEMPTS or not template_in_use(error):
+                    raise
+                time.sleep(_CLONE_RETRY_INTERVAL * attempts)
+            else:
+                break
+        return engine
+
+    def _next_template(self) -> str:
+        assert self._template_db_name is not None
+        templates = [self._template_db_name, *self._template_replicas]
+        return templates[next(self._clones) % len(templates)]
+
+    def _create_template_replicas(self, template_db: str, encoding: str) -> None:
+        for _ in range(self._template_replica_count - 1):
+            # Other processes may be cloning the same shared template right now
+            engine = self._clone(
+                "elefast-template-replica", encoding, template=template_db
+            )
+            engine.dispose()
+            assert engine.url.database
+            self._template_replicas.append(engine.url.database)
+
+
+_TEMPLATE_SCHEMA = "elefast_template"
+"""The schema that is migrated once when using `isolation="schema"`."""
+
+_ENGINE_OPTIONS: Mapping[str, Any] = MappingProxyType(
+    {"pool_size": 2, "max_overflow": 3}
+)
+"""The default `engine_options`, a test usually needs one or two connections at a time."""
+
+_ADMIN_POOL_SIZE = 5
+"""How many connections to the server are kept open for creating and dropping databases."""
+
+_NATIVE_DRIVERS = {"psycopg", "psycopg2"}
+"""Drivers whose connections we can use directly for `CREATE DATABASE` and `DROP DATABASE`."""
+
+_CLONE_ATTEMPTS = 5
+"""How often we try to clone a template that is being accessed by another session."""
+
+_CLONE_RETRY_INTERVAL = 0.1
+"""Seconds to wait before the first retry, increasing linearly with each attempt."""
+
+_ENCODING_QUERY = (
+    "SELECT pg_encoding_to_char(encoding) FROM pg_database WHERE datname = :name"
+)
+
+
+_UNTOUCHED_POLLS = 50
+"""How often we check whether the connections to a dropped database are gone, before we give up on reusing it."""
+
+_UNTOUCHED_POLL_INTERVAL = 0.01
+"""Seconds between these checks."""
+
+_POOLED_DATABASE_OPTIONS = ("elefast", "utf8")
+"""The `prefix` and `encoding` of databases in the pool. Databases requested with other options bypass it."""
+
+
+class _DatabasePool:
+    """
+    Keeps `size` spare databases around, which are refilled by a background thread.
+    """
+
+    def __init__(self, size: int, create: Callable[[], Engine]) -> None:
+        self._size = size
+        self._create = create
+        self._spares: Queue[Engine | Exception | None] = Queue()
+        self._refill = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._closed = False
+
+    def take(self) -> Engine:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("The pool of databases has been closed.")
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._fill, name="elefast-pool", daemon=True
+                )
+                self._thread.start()
+        spare = self._spares.get()
+        if spare is None:
+            # The pool was closed while we were waiting, wake up the other waiting callers as well
+            self._spares.put(None)
+            raise RuntimeError("The pool of databases has been closed.")
+        self._refill.set()
+        if isinstance(spare, Exception):
+            # Each error is only handed to a single caller, the next one gets a database cloned after it
+            raise spare
+        return spare
+
+    def close(self) -> list[Engine]:
+        """
+        Stops the background thread and returns the spares that were not handed out.
+        """
+        with self._lock:
+            self._closed = True
+        self._refill.set()
+        if self._thread is not None:
+            self._thread.join()
+        spares = []
+        while not self._spares.empty():
+            spare = self._spares.get_nowait()
+            if spare is not None and not isinstance(spare, Exception):
+                spares.append(spare)
+        self._spares.put(None)
+        return spares
+
+    def _fill(self) -> None:
+        while not self._closed:
+            self._refill.clear()
+            while not self._closed and self._spares.qsize() < self._size:
+                try:
+                    spare: Engine | Exception = self._create()
+                except Exception as error:  # noqa: BLE001 - raised by take()
+                    spare = error
+                self._spares.put(spare)
+            self._refill.wait()
+
+
+class _BackgroundDropper:
+    """
+    Drops databases in batches from a background thread.
+    """
+
+    def __init__(self, drop: Callable[[list[str]], None], max_pending: int) -> None:
+        self._drop = drop
+        self._pending: Queue[str | None] = Queue(maxsize=max_pending)
+        self._errors: list[Exception] = []
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def submit(self, name: str) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._work, name="elefast-dropper", daemon=True
+                )
+                self._thread.start()
+        # Blocks in case there are already too many databases waiting to be dropped
+        self._pending.put(name)
+
+    def close(self) -> None:
+        """
+        Waits until all pending databases are dropped and stops the background thread.
+        """
+        if self._thread is not None:
+            self._pending.put(None)
+            self._thread.join()
+            self._thread = None
+        if self._errors:
+            errors, self._errors = self._errors, []
+            raise ExceptionGroup("Could not drop all databases", errors)
+
+    def _work(self) -> None:
+        while True:
+            batch = [self._pending.get()]
+            while True:
+                try:
+                    batch.append(self._pending.get_nowait())
+                except Empty:
+                    break
+            names = [name for name in batch if name is not None]
+            try:
+                if names:
+                    self._drop(names)
+            except ExceptionGroup as group:
+                self._errors.extend(group.exceptions)
+            except Exception as error:  # noqa: BLE001 - raised by close()
+                self._errors.append(error)
+            if None in batch:
+                return
+
+
+def _encoding_key(encoding: str) -> str:
+    # Postgres ignores case and punctuation in encoding names, e.g. "UTF8" and "utf-8" are the same
+    return "".join(character for character in encoding.lower() if character.isalnum())
+
+
+def _warm_up(engine: Engine) -> None:
+    # Returning the connection keeps it in the pool of the engine
+    with engine.connect():
+        pass
 
 
 def _build_engine(input: CanBeTurnedIntoEngine) -> Engine:
     if isinstance(input, Engine):
         return input
     if isinstance(input, URL | str):
-        return create_engine(input, isolation_level="autocommit", poolclass=NullPool)
+        # Keeps a few admin connections open, so creating and dropping databases does not pay for connecting each
+        # time. Pre-pinging replaces connections that broke, e.g. because the server was restarted.
+        return create_engine(
+            input,
+            isolation_level="autocommit",
+            pool_size=_ADMIN_POOL_SIZE,
+            pool_pre_ping=True,
+        )
     raise TypeError()
 
 
@@ -188,14 +1220,46 @@ def _prepare_database(
     prefix: str = "elefast",
     encoding: str = "utf8",
     template: str | None = None,
+    strategy: CloneStrategy = _DEFAULT_STRATEGY,
+    native: bool = False,
+    prototype: Engine | None = None,
+    options: Mapping[str, Any] | None = None,
 ) -> Engine:
     database = f"{prefix}-{uuid4()}"
-    with engine.begin() as connection:
-        statement = (
-            f"CREATE DATABASE \"{database}\" ENCODING '{encoding}' TEMPLATE template0"
-            if template is None
-            else f'CREATE DATABASE "{database}" WITH TEMPLATE "{template}" ENCODING \'{encoding}\''
-        )
-        connection.execute(text(statement))
-        connection.commit()
-    return create_engine(engine.url.set(database=database))
+    statement = (
+        f"CREATE DATABASE \"{database}\" ENCODING '{encoding}' TEMPLATE template0"
+        if template is None
+        else strategy.create_database_statement(database, template, encoding)
+    )
+    _execute_admin_statements(engine, [statement], native)
+    if prototype is not None:
+        return derive_engine(prototype, database)
+    return create_engine(engine.url.set(database=database), **(options or {}))
+
+
+def _execute_admin_statements(
+    engine: Engine, statements: list[str], native: bool = False
+) -> None:
+    if not native or engine.dialect.driver not in _NATIVE_DRIVERS:
+        with engine.begin() as connection:
+            for statement in statements:
+                connection.execute(text(statement))
+            connection.commit()
+        return
+    # These statements can't run inside a transaction anyway, so we skip SQLAlchemy's transaction handling
+    connection = engine.raw_connection()
+    try:
+        driver_connection = connection.driver_connection
+        autocommit = driver_connection.autocommit
+        driver_connection.autocommit = True
+        try:
+            cursor = driver_connection.cursor()
+            try:
+                for statement in statements:
+                    cursor.execute(statement)
+            finally:
+                cursor.close()
+        finally:
+            driver_connection.autocommit = autocommit
+    finally:
+        connection.close()
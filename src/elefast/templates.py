@@ -0,0 +1,223 @@
+"""
+Utilities for naming template databases, so they can be reused across test sessions.
+"""
+
+from __future__ import annotations
+
+import os
+from collections.abc import Iterable
+from hashlib import sha256
+from typing import Protocol, runtime_checkable
+
+from sqlalchemy import Connection, Dialect, MetaData, create_mock_engine
+from sqlalchemy.schema import CreateSchema, ExecutableDDLElement
+from sqlalchemy.util import portable_instancemethod
+
+TEMPLATE_PREFIX = "elefast-template"
+"""All persistent templates start with this prefix."""
+
+_REVISION_COMMENT_PREFIX = "elefast revision "
+
+_MULTI_STATEMENT_DRIVERS = {"psycopg", "psycopg2"}
+"""Drivers that accept several statements separated by semicolons in a single execution."""
+
+CANDIDATES_QUERY = (
+    "SELECT datname, shobj_description(oid, 'pg_database') FROM pg_database "
+    f"WHERE datname LIKE '{TEMPLATE_PREFIX}-%' ORDER BY oid DESC"
+)
+"""Lists all persistent templates with their comments, most recently created first."""
+
+
+@runtime_checkable
+class Fingerprinted(Protocol):
+    """
+    Implemented by migrators that can tell whether the schema they create has changed.
+    """
+
+    def fingerprint(self) -> str:
+        """
+        Returns a string that changes whenever the schema created by the migrator changes.
+        """
+        ...
+
+
+@runtime_checkable
+class Upgradable(Fingerprinted, Protocol):
+    """
+    Implemented by migrators that can bring a template created for an older revision of the schema up to date.
+
+    Their `migrate()` method must only apply the changes that are missing from the database it is called with.
+    """
+
+    def revision(self) -> str:
+        """
+        Identifies the current revision of the schema, e.g. the Alembic head.
+        """
+        ...
+
+    def fingerprint_at(self, revision: str) -> str | None:
+        """
+        The fingerprint the schema had at an earlier `revision`, or `None` if the revision is no longer known.
+        """
+        ...
+
+
+def template_name(fingerprint: str, encoding: str) -> str:
+    """
+    The name of the persistent template database for a schema with the given `fingerprint`.
+    """
+    digest = sha256(f"{encoding}:{fingerprint}".encode()).hexdigest()
+    # Postgres truncates identifiers longer than 63 characters
+    return f"{TEMPLATE_PREFIX}-{digest[:32]}"
+
+
+def xdist_template_name(fingerprint: str, encoding: str) -> str | None:
+    """
+    A template name shared by all [`pytest-xdist`](https://pypi.org/project/pytest-xdist) workers of the current test
+    run, or `None` when not running under xdist.
+    """
+    run = os.environ.get("PYTEST_XDIST_TESTRUNUID")
+    if run is None:
+        return None
+    return template_name(f"{run}:{fingerprint}", encoding)
+
+
+def xdist_worker_index() -> int:
+    """
+    The number of the current [`pytest-xdist`](https://pypi.org/project/pytest-xdist) worker (`gw3` is 3), or 0 when
+    not running under xdist.
+    """
+    worker = os.environ.get("PYTEST_XDIST_WORKER", "")
+    return int(worker.removeprefix("gw")) if worker.startswith("gw") else 0
+
+
+def lock_key(name: str) -> int:
+    """
+    The key for `pg_advisory_lock()` that guards building the template called `name`.
+    """
+    return int.from_bytes(sha256(name.encode()).digest()[:8], "big", signed=True)
+
+
+def metadata_ddl(metadata: MetaData, dialect: Dialect | None = None) -> list[str]:
+    """
+    Compiles the statements that `metadata.create_all()` would execute on an empty Postgres database.
+
+    Pass the `dialect` of the connection the statements will be executed on, since drivers differ in how they escape
+    some characters (e.g. `%`).
+    """
+    statements: list[str] = []
+
+    def collect(sql, *multiparams, **params) -> None:
+        statements.append(str(sql.compile(dialect=dialect or engine.dialect)).strip())
+
+    engine = create_mock_engine("postgresql://", collect)
+    metadata.create_all(engine, checkfirst=False)
+    return statements
+
+
+def metadata_script(metadata: MetaData, dialect: Dialect) -> list[str]:
+    """
+    All statements needed to create the schema of `metadata` in an empty database, including its schemas.
+    """
+    schemas = sorted(_schemas(metadata))
+    return [
+        *(
+            str(CreateSchema(schema, if_not_exists=True).compile(dialect=dialect))
+            for schema in schemas
+        ),
+        *metadata_ddl(metadata, dialect),
+    ]
+
+
+def execute_script(connection: Connection, statements: list[str]) -> None:
+    """
+    Executes `statements` in a single round trip if the driver supports it, otherwise one after another.
+    """
+    if not statements:
+        return
+    if connection.dialect.driver in _MULTI_STATEMENT_DRIVERS:
+        connection.exec_driver_sql(";\n".join(statements))
+    else:
+        for statement in statements:
+            connection.exec_driver_sql(statement)
+
+
+def migrate_metadata(
+    connection: Connection,
+    metadata: MetaData,
+    scripts: dict[str, list[str]],
+    drop_existing: bool = False,
+) -> None:
+    """
+    Creates the tables of `metadata` in an empty database, using the script compiled for the driver of `connection`.
+
+    The script does not check for existing tables, which would cost a round trip per table. Pass `drop_existing=True`
+    to drop them first when the database is not empty. Scripts are cached in `scripts`, by driver. Metadata with
+    `before_create` or `after_create` listeners that need a real connection is created with `metadata.create_all()`
+    instead.
+    """
+    if drop_existing:
+        metadata.drop_all(bind=connection)
+    if _has_connection_listeners(metadata):
+        for schema in sorted(_schemas(metadata)):
+            connection.execute(CreateSchema(schema, if_not_exists=True))
+        metadata.create_all(bind=connection)
+        return
+    driver = connection.dialect.driver
+    if driver not in scripts:
+        scripts[driver] = metadata_script(metadata, connection.dialect)
+    execute_script(connection, scripts[driver])
+
+
+def _has_connection_listeners(metadata: MetaData) -> bool:
+    # DDL listeners compile like everything else, and SQLAlchemy uses instance methods for types like ENUM
+    return any(
+        not isinstance(listener, ExecutableDDLElement | portable_instancemethod)
+        for target in (metadata, *metadata.tables.values())
+        for listeners in (target.dispatch.before_create, target.dispatch.after_create)
+        for listener in listeners
+    )
+
+
+def _schemas(metadata: MetaData) -> set[str]:
+    return {
+        table.schema
+        for table in metadata.tables.values()
+        if table.schema is not None and table.schema != "public"
+    }
+
+
+def metadata_fingerprint(metadata: MetaData) -> str:
+    """
+    A fingerprint for the schema created by `metadata`, derived from its compiled DDL.
+    """
+    schemas = sorted(_schemas(metadata))
+    digest = sha256()
+    for part in [*schemas, *metadata_ddl(metadata)]:
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def revision_comment_statement(name: str, revision: str) -> str:
+    """
+    Records which `revision` of the schema the persistent template `name` was built for.
+    """
+    comment = (_REVISION_COMMENT_PREFIX + revision).replace("'", "''")
+    return f"COMMENT ON DATABASE \"{name}\" IS '{comment}'"
+
+
+def upgradable_template(
+    migrator: Upgradable, encoding: str, candidates: Iterable[tuple[str, str | None]]
+) -> str | None:
+    """
+    Picks a template from `candidates` (the rows of `CANDIDATES_QUERY`) that was built for an older revision of the
+    schema, whose history has not changed since, so that only the newer migrations need to be applied on a clone.
+    """
+    for name, comment in candidates:
+        if comment is None or not comment.startswith(_REVISION_COMMENT_PREFIX):
+            continue
+        fingerprint = migrator.fingerprint_at(comment[len(_REVISION_COMMENT_PREFIX) :])
+        if fingerprint is not None and template_name(fingerprint, encoding) == name:
+            return name
+    return None
@@ -1,18 +1,25 @@
 """Tests for the elefast.asyncio module."""
 
+import asyncio
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from sqlalchemy import URL
+from sqlalchemy.ext.asyncio import AsyncEngine
 
 from elefast.asyncio import (
     AsyncDatabase,
+    AsyncDatabaseSchema,
     AsyncDatabaseServer,
     AsyncMetadataMigrator,
+    AsyncReadOnlyDatabase,
+    _AsyncBackgroundDropper,
+    _AsyncDatabasePool,
     _build_engine,
     _prepare_async_database,
 )
 from elefast.errors import DatabaseNotReadyError
+from elefast.reset import install_write_tracking, written_tuples
 
 
 class TestBuildEngineAsync:
@@ -117,6 +124,29 @@ class TestAsyncDatabase:
         server.drop_database.assert_awaited_once_with("test_db")
 
 
+class TestAsyncTransactionalDatabase:
+    """Tests for the AsyncTransactionalDatabase class."""
+
+    @pytest.mark.asyncio
+    async def test_changes_are_rolled_back(self, mock_async_engine):
+        """Test that the outer transaction is rolled back on exit."""
+        connection = AsyncMock()
+        transaction = AsyncMock()
+        transaction.is_active = True
+        connection.begin.return_value = transaction
+        mock_async_engine.connect = AsyncMock(return_value=connection)
+        db = AsyncDatabase(
+            engine=mock_async_engine, server=MagicMock(spec=AsyncDatabaseServer)
+        )
+
+        async with db.transactional() as transactional:
+            session = transactional.session()
+            assert session.bind is connection
+
+        transaction.rollback.assert_awaited_once()
+        connection.close.assert_awaited_once()
+
+
 class TestAsyncDatabaseServer:
     """Tests for the AsyncDatabaseServer class."""
 
@@ -298,6 +328,118 @@ class TestAsyncDatabaseServerCreateDatabase:
 
         assert isinstance(db, AsyncDatabase)
 
+    @pytest.mark.asyncio
+    @patch("elefast.asyncio._prepare_async_database")
+    async def test_warm_up_opens_first_connection(
+        self, mock_prepare, mock_async_engine
+    ):
+        """Test the first connection is opened while creating the database."""
+        mock_new_engine = MagicMock()
+        mock_new_engine.url.database = "elefast-1"
+        mock_new_engine.dispose = AsyncMock()
+        mock_new_engine.connect.return_value.__aenter__ = AsyncMock()
+        mock_new_engine.connect.return_value.__aexit__ = AsyncMock(return_value=False)
+        mock_prepare.return_value = mock_new_engine
+
+        server = AsyncDatabaseServer(engine=mock_async_engine, warm_up=True)
+        await server.create_database()
+
+        mock_new_engine.connect.return_value.__aenter__.assert_awaited_once()
+
+
+class TestAsyncDatabaseServerPool:
+    """Tests for the pre-warmed pool of AsyncDatabaseServer."""
+
+    @pytest.mark.asyncio
+    @patch("elefast.asyncio._prepare_async_database")
+    async def test_pool_hands_out_spare_databases(
+        self, mock_prepare, mock_async_engine
+    ):
+        """Test create_database() takes databases from the pool."""
+        names = iter(["elefast-template-1", "spare-1", "spare-2", "spare-3"])
+
+        async def side_effect(*args, **kwargs):
+            engine = MagicMock()
+            engine.url.database = next(names)
+            engine.dispose = AsyncMock()
+            return engine
+
+        mock_prepare.side_effect = side_effect
+
+        server = AsyncDatabaseServer(engine=mock_async_engine, pool_size=2)
+        db = await server.create_database()
+
+        assert db.name == "spare-1"
+        assert server._pool is not None
+        assert server._pool._task is not None
+        await server._pool._task  # Lets the background task refill the pool
+        with patch.object(server, "drop_database", AsyncMock()) as mock_drop:
+            await server.close()
+        dropped = [call.args[0] for call in mock_drop.await_args_list]
+        assert dropped
+        assert "spare-1" not in dropped
+
+    @pytest.mark.asyncio
+    @patch("elefast.asyncio._prepare_async_database")
+    async def test_pool_propagates_errors(self, mock_prepare, mock_async_engine):
+        """Test errors while cloning in the background surface in create_database()."""
+        mock_template_engine = MagicMock()
+        mock_template_engine.url.database = "elefast-template-1"
+        mock_template_engine.dispose = AsyncMock()
+        mock_prepare.side_effect = [mock_template_engine, RuntimeError("boom")]
+
+        server = AsyncDatabaseServer(engine=mock_async_engine, pool_size=1)
+        with pytest.raises(RuntimeError, match="boom"):
+            await server.create_database()
+
+    @pytest.mark.asyncio
+    @patch("elefast.asyncio._prepare_async_database")
+    async def test_pool_recovers_from_errors(self, mock_prepare, mock_async_engine):
+        """Test an error is only raised once and the pool keeps cloning afterwards."""
+        names = iter(["elefast-template-1", "spare-1", "spare-2", "spare-3"])
+
+        async def side_effect(*args, **kwargs):
+            if mock_prepare.call_count == 2:
+                raise RuntimeError("template busy")
+            engine = MagicMock()
+            engine.url.database = next(names)
+            engine.dispose = AsyncMock()
+            return engine
+
+        mock_prepare.side_effect = side_effect
+
+        server = AsyncDatabaseServer(engine=mock_async_engine, pool_size=1)
+        with pytest.raises(RuntimeError, match="template busy"):
+            await server.create_database()
+        db = await server.create_database()
+
+        assert db.name == "spare-1"
+
+    @pytest.mark.asyncio
+    async def test_take_after_close_raises(self):
+        """Test the pool can not be used after it was closed."""
+        pool = _AsyncDatabasePool(size=1, create=AsyncMock())
+        await pool.close()
+
+        with pytest.raises(RuntimeError, match="closed"):
+            await pool.take()
+
+    def test_pool_survives_event_loop_changes(self):
+        """Test the pool works with a new event loop for each test."""
+        names = iter(["spare-1", "spare-2", "spare-3", "spare-4"])
+
+        async def create():
+            engine = MagicMock(spec=AsyncEngine)
+            engine.url.database = next(names)
+            return engine
+
+        pool = _AsyncDatabasePool(size=1, create=create)
+        first = asyncio.run(pool.take())
+        second = asyncio.run(pool.take())
+
+        assert first.url.database == "spare-1"
+        assert second.url.database in {"spare-2", "spare-3"}
+
 
 class TestAsyncDatabaseServerDropDatabase:
     """Tests for AsyncDatabaseServer.drop_database()."""
@@ -320,6 +462,485 @@ class TestAsyncDatabaseServerDropDatabase:
         assert "test_db_to_drop" in str(call_args)
 
 
+class TestAsyncDatabaseServerBackgroundDrops:
+    """Tests for dropping databases in the background."""
+
+    @pytest.mark.asyncio
+    async def test_drops_are_deferred_until_close(self, mock_async_engine):
+        """Test drop_database() returns before and close() waits for the drops."""
+        mock_connection = AsyncMock()
+        mock_async_engine.begin.return_value.__aenter__ = AsyncMock(
+            return_value=mock_connection
+        )
+        mock_async_engine.begin.return_value.__aexit__ = AsyncMock(return_value=False)
+
+        server = AsyncDatabaseServer(engine=mock_async_engine, background_drops=True)
+        for i in range(5):
+            await server.drop_database(f"db-{i}")
+        mock_connection.execute.assert_not_awaited()
+
+        await server.close()
+
+        statements = [str(c[0][0]) for c in mock_connection.execute.call_args_list]
+        assert statements == [f'DROP DATABASE "db-{i}"' for i in range(5)]
+
+    @pytest.mark.asyncio
+    async def test_every_failed_drop_is_reported(self, mock_async_engine):
+        """Test one error is collected for each database that could not be dropped."""
+        mock_async_engine.begin.side_effect = RuntimeError("connection lost")
+
+        server = AsyncDatabaseServer(engine=mock_async_engine, background_drops=True)
+        for i in range(3):
+            await server.drop_database(f"db-{i}")
+
+        with pytest.raises(ExceptionGroup) as info:
+            await server.close()
+        assert len(info.value.exceptions) == 3
+
+    def test_drops_survive_event_loop_changes(self):
+        """Test drops queued by tests with their own event loop are still carried out."""
+        dropped = []
+        started = asyncio.Event()
+
+        async def drop(names):
+            started.set()
+            await asyncio.sleep(0.01)
+            dropped.extend(names)
+
+        dropper = _AsyncBackgroundDropper(drop, max_pending=2)
+
+        async def first_test():
+            await dropper.submit("db-1")
+            await started.wait()
+
+        async def second_test():
+            for name in ["db-2", "db-3", "db-4"]:
+                await dropper.submit(name)
+
+        # The first loop closes while db-1 is being dropped
+        asyncio.run(first_test())
+        asyncio.run(second_test())
+        asyncio.run(dropper.close())
+
+        assert sorted(dropped) == ["db-1", "db-2", "db-3", "db-4"]
+
+    @pytest.mark.asyncio
+    async def test_close_raises_drop_errors(self, mock_async_engine):
+        """Test errors of background drops surface when closing the server."""
+        mock_async_engine.begin.side_effect = RuntimeError("connection lost")
+
+        server = AsyncDatabaseServer(engine=mock_async_engine, background_drops=True)
+        await server.drop_database("db-1")
+
+        with pytest.raises(ExceptionGroup):
+            await server.close()
+
+
+class TestAsyncDatabaseServerRecycleDatabases:
+    """Tests for resetting and re-using databases instead of dropping them."""
+
+    @pytest.mark.asyncio
+    @patch("elefast.asyncio._derive_async_engine")
+    @patch("elefast.asyncio._prepare_async_database")
+    async def test_dropped_database_is_reused(
+        self, mock_prepare, mock_derive_engine, mock_async_engine
+    ):
+        """Test that a reset database is handed out again."""
+        mock_new_engine = MagicMock()
+        mock_new_engine.url.database = "elefast-1"
+        mock_new_engine.dispose = AsyncMock()
+        mock_prepare.return_value = mock_new_engine
+        mock_derive_engine.return_value = mock_new_engine
+
+        server = AsyncDatabaseServer(engine=mock_async_engine, recycle_databases=True)
+        with (
+            patch.object(server, "_reset_database", AsyncMock()) as mock_reset,
+            patch.object(server, "_drop_databases", AsyncMock()) as mock_drop,
+        ):
+            db = await server.create_database()
+            await db.drop()
+            mock_prepare.reset_mock()
+            db = await server.create_database()
+
+        mock_reset.assert_awaited_once_with("elefast-1")
+        mock_drop.assert_not_awaited()
+        mock_prepare.assert_not_called()
+        assert db.name == "elefast-1"
+
+    @pytest.mark.asyncio
+    @patch("elefast.asyncio._prepare_async_database")
+    async def test_track_writes_installs_triggers(
+        self, mock_prepare, mock_async_engine
+    ):
+        """Test that track_writes installs the tracking triggers in the template."""
+        connection = AsyncMock()
+        mock_new_engine = MagicMock()
+        mock_new_engine.url.database = "elefast-1"
+        mock_new_engine.dispose = AsyncMock()
+        mock_new_engine.begin.return_value.__aenter__ = AsyncMock(
+            return_value=connection
+        )
+        mock_new_engine.begin.return_value.__aexit__ = AsyncMock(return_value=False)
+        mock_prepare.return_value = mock_new_engine
+
+        server = AsyncDatabaseServer(engine=mock_async_engine, track_writes=True)
+        await server.create_database()
+
+        connection.run_sync.assert_awaited_once_with(install_write_tracking)
+
+    @pytest.mark.asyncio
+    async def test_database_reset_applies_plan(self, mock_async_engine):
+        """Test that AsyncDatabase.reset() applies the plan of the server."""
+        connection = AsyncMock()
+        mock_async_engine.begin.return_value.__aenter__ = AsyncMock(
+            return_value=connection
+        )
+        mock_async_engine.begin.return_value.__aexit__ = AsyncMock(return_value=False)
+        server = MagicMock(spec=AsyncDatabaseServer)
+        plan = MagicMock()
+        server.reset_plan = AsyncMock(return_value=plan)
+
+        db = AsyncDatabase(engine=mock_async_engine, server=server)
+        await db.reset()
+
+        connection.run_sync.assert_awaited_once_with(plan.apply)
+
+
+class TestAsyncDatabaseServerReuseUntouched:
+    """Tests for handing out databases again that were not written to."""
+
+    @pytest.mark.asyncio
+    @patch("elefast.asyncio._derive_async_engine")
+    @patch("elefast.asyncio._prepare_async_database")
+    async def test_untouched_database_is_reused(
+        self, mock_prepare, mock_derive_engine, mock_async_engine
+    ):
+        """Test that a database without writes is handed out again."""
+        mock_new_engine = MagicMock()
+        mock_new_engine.url.database = "elefast-1"
+        mock_new_engine.dispose = AsyncMock()
+        mock_prepare.return_value = mock_new_engine
+        mock_derive_engine.return_value = mock_new_engine
+        connection = AsyncMock()
+        connection.run_sync.side_effect = [(1, 5), (0, 5), (0, 5)]
+        mock_async_engine.dialect = MagicMock(server_version_info=(16, 0))
+        mock_async_engine.connect.return_value.__aenter__ = AsyncMock(
+            return_value=connection
+        )
+        mock_async_engine.connect.return_value.__aexit__ = AsyncMock(return_value=False)
+
+        server = AsyncDatabaseServer(engine=mock_async_engine, reuse_untouched=True)
+        with patch.object(server, "_drop_databases", AsyncMock()) as mock_drop:
+            db = await server.create_database()
+            await db.drop()
+            mock_prepare.reset_mock()
+            db = await server.create_database()
+
+        mock_drop.assert_not_awaited()
+        mock_prepare.assert_not_called()
+        assert db.name == "elefast-1"
+        connection.run_sync.assert_awaited_with(written_tuples, "elefast-1")
+
+
+class TestAsyncDatabaseServerReadOnlyDatabase:
+    """Tests for the shared read-only database."""
+
+    @pytest.mark.asyncio
+    @patch("elefast.asyncio._derive_async_engine")
+    @patch("elefast.asyncio._prepare_async_database")
+    async def test_database_is_cloned_once(
+        self, mock_prepare, mock_derive_engine, mock_async_engine
+    ):
+        """Test that all callers share a single read-only clone."""
+        mock_new_engine = MagicMock()
+        mock_new_engine.url.database = "elefast-read-only-1"
+        mock_new_engine.dispose = AsyncMock()
+        mock_prepare.return_value = mock_new_engine
+        mock_derive_engine.return_value = mock_new_engine
+
+        server = AsyncDatabaseServer(engine=mock_async_engine)
+        first = await server.create_read_only_database()
+        second = await server.create_read_only_database()
+        with patch.object(server, "_drop_databases", AsyncMock()) as mock_drop:
+            await first.drop()
+            mock_drop.assert_not_awaited()
+            await server.close()
+
+        assert mock_prepare.call_count == 2
+        assert isinstance(first, AsyncReadOnlyDatabase)
+        assert first.name == second.name == "elefast-read-only-1"
+        mock_drop.assert_awaited_once_with(["elefast-read-only-1"])
+
+
+class TestAsyncDatabaseServerSnapshots:
+    """Tests for cloning snapshots of databases."""
+
+    @pytest.mark.asyncio
+    @patch("elefast.asyncio._prepare_async_database")
+    async def test_snapshot_and_clone(self, mock_prepare, mock_async_engine):
+        """Test that a snapshot is copied from the database and cloned later on."""
+        mock_connection = AsyncMock()
+        mock_connection.execute.return_value = MagicMock()
+        mock_connection.execute.return_value.scalar_one.return_value = "utf8"
+        mock_async_engine.connect.return_value.__aenter__ = AsyncMock(
+            return_value=mock_connection
+        )
+        mock_async_engine.connect.return_value.__aexit__ = AsyncMock(return_value=False)
+        engines = []
+        for name in ["elefast-snapshot-1", "elefast-2"]:
+            engine = MagicMock()
+            engine.url.database = name
+            engine.dispose = AsyncMock()
+            engines.append(engine)
+        mock_prepare.side_effect = engines
+
+        server = AsyncDatabaseServer(engine=mock_async_engine)
+        snapshot = await server.snapshot_database("elefast-1")
+        clone = await server.create_database(from_snapshot=snapshot)
+
+        assert snapshot == "elefast-snapshot-1"
+        engines[0].dispose.assert_awaited_once()
+        assert mock_prepare.call_args_list[0][1]["template"] == "elefast-1"
+        assert mock_prepare.call_args_list[1][1]["template"] == snapshot
+        assert clone.name == "elefast-2"
+
+    @pytest.mark.asyncio
+    async def test_unknown_snapshot_is_rejected(self, mock_async_engine):
+        """Test that cloning a snapshot this server did not create raises a helpful error."""
+        server = AsyncDatabaseServer(engine=mock_async_engine)
+        with pytest.raises(ValueError, match="elefast-snapshot-1"):
+            await server.create_database(from_snapshot="elefast-snapshot-1")
+
+
+class TestAsyncDatabaseServerDerivedTemplates:
+    """Tests for templates derived by running seed functions."""
+
+    @pytest.mark.asyncio
+    @patch("elefast.asyncio._prepare_async_database")
+    async def test_derived_template_is_cached(self, mock_prepare, mock_async_engine):
+        """Test that the seed runs once and its result can be cloned."""
+        connection = AsyncMock()
+        mock_new_engine = MagicMock()
+        mock_new_engine.url.database = "elefast-template-db-1"
+        mock_new_engine.dispose = AsyncMock()
+        mock_new_engine.begin.return_value.__aenter__ = AsyncMock(
+            return_value=connection
+        )
+        mock_new_engine.begin.return_value.__aexit__ = AsyncMock(return_value=False)
+        mock_prepare.return_value = mock_new_engine
+        seed = AsyncMock()
+
+        server = AsyncDatabaseServer(engine=mock_async_engine)
+        with patch.object(
+            server, "_build_template", AsyncMock(return_value="base-template")
+        ):
+            first = await server.derive_template("seeded", seed)
+            second = await server.derive_template("seeded", seed)
+            await server.create_database(from_snapshot=first)
+
+        assert first == second == "elefast-template-db-1"
+        seed.assert_awaited_once_with(connection)
+        assert mock_prepare.call_args_list[0][1]["template"] == "base-template"
+        assert mock_prepare.call_args_list[1][1]["template"] == first
+
+
+class TestAsyncDatabaseServerSchemaIsolation:
+    """Tests for isolating tests using schemas instead of databases."""
+
+    @pytest.mark.asyncio
+    @patch("elefast.asyncio._derive_async_engine")
+    @patch("elefast.asyncio._prepare_async_database")
+    async def test_create_database_returns_schema(
+        self, mock_prepare, mock_derive_engine, mock_async_engine
+    ):
+        """Test that each call creates a new schema in the shared database."""
+        connection = AsyncMock()
+        shared_engine = MagicMock()
+        shared_engine.url.database = "elefast-shared-db-1"
+        shared_engine.begin.return_value.__aenter__ = AsyncMock(return_value=connection)
+        shared_engine.begin.return_value.__aexit__ = AsyncMock(return_value=False)
+        mock_prepare.return_value = shared_engine
+        mock_derive_engine.return_value.url.database = "elefast-shared-db-1"
+
+        server = AsyncDatabaseServer(engine=mock_async_engine, isolation="schema")
+        with (
+            patch("elefast.asyncio.pin_search_path"),
+            patch("elefast.asyncio.record_statements"),
+        ):
+            first = await server.create_database()
+            second = await server.create_database()
+
+        mock_prepare.assert_called_once()
+        assert isinstance(first, AsyncDatabaseSchema)
+        assert first.schema != second.schema
+
+
+class TestAsyncDatabaseServerConcurrentTemplateBuild:
+    """Tests for building the template only once under concurrency."""
+
+    @pytest.mark.asyncio
+    @patch("elefast.asyncio._prepare_async_database")
+    async def test_template_is_built_once(self, mock_prepare, mock_async_engine):
+        """Test gathered create_database() calls share a single template build."""
+
+        async def build_template(encoding, base=None):
+            await asyncio.sleep(0.01)
+            return "elefast-template-1"
+
+        server = AsyncDatabaseServer(engine=mock_async_engine)
+        with patch.object(
+            server, "_build_template", side_effect=build_template
+        ) as mock_build:
+            await asyncio.gather(*(server.create_database() for _ in range(4)))
+
+        mock_build.assert_called_once()
+        templates = {call[1]["template"] for call in mock_prepare.call_args_list}
+        assert templates == {"elefast-template-1"}
+
+
+class TestAsyncDatabaseServerPrepare:
+    """Tests for building the template ahead of time."""
+
+    @pytest.mark.asyncio
+    @patch("elefast.asyncio._prepare_async_database")
+    async def test_prepare_builds_template_in_background(
+        self, mock_prepare, mock_async_engine
+    ):
+        """Test create_database() reuses the template built by prepare()."""
+        server = AsyncDatabaseServer(engine=mock_async_engine)
+        with patch.object(
+            server, "_build_template", AsyncMock(return_value="elefast-template-1")
+        ) as mock_build:
+            assert server.prepare() is server
+            await server.create_database()
+            await server.close()
+
+        mock_build.assert_awaited_once()
+        assert mock_prepare.call_args[1]["template"] == "elefast-template-1"
+
+    @pytest.mark.asyncio
+    @patch("elefast.asyncio._prepare_async_database")
+    async def test_failed_preparation_is_raised(self, mock_prepare, mock_async_engine):
+        """Test errors of the background build surface in create_database()."""
+        server = AsyncDatabaseServer(engine=mock_async_engine)
+        with patch.object(
+            server, "_build_template", AsyncMock(side_effect=RuntimeError("boom"))
+        ) as mock_build:
+            server.prepare()
+            await server._preparation
+            with pytest.raises(RuntimeError, match="boom"):
+                await server.create_database()
+
+        mock_build.assert_awaited_once()
+
+    @patch("elefast.asyncio._prepare_async_database")
+    def test_preparation_on_another_event_loop(self, mock_prepare, mock_async_engine):
+        """Test a build stuck on a loop that stopped running is replaced by one on the current loop."""
+        builds = []
+
+        async def build_template(encoding, base=None):
+            builds.append(asyncio.get_running_loop())
+            if len(builds) == 1:
+                await asyncio.Event().wait()  # Never finishes, its loop stops first
+            return "elefast-template-1"
+
+        async def session_fixture():
+            server.prepare()
+            await asyncio.sleep(0)
+
+        async def test():
+            await asyncio.wait_for(server.create_database(), timeout=1)
+            await server.close()
+
+        server = AsyncDatabaseServer(engine=mock_async_engine)
+        session_loop = asyncio.new_event_loop()
+        with patch.object(server, "_build_template", side_effect=build_template):
+            session_loop.run_until_complete(session_fixture())
+            preparation = server._preparation
+            asyncio.run(test())
+        session_loop.run_until_complete(asyncio.sleep(0))
+        session_loop.close()
+
+        assert len(builds) == 2
+        assert builds[0] is session_loop
+        assert preparation.cancelled()
+        assert mock_prepare.call_args[1]["template"] == "elefast-template-1"
+
+
+class TestAsyncDatabaseServerCreateDatabases:
+    """Tests for creating several databases at once."""
+
+    @pytest.mark.asyncio
+    async def test_limits_concurrency(self, mock_async_engine):
+        """Test no more than `concurrency` databases are created at the same time."""
+        server = AsyncDatabaseServer(engine=mock_async_engine)
+        running = 0
+        peak = 0
+
+        async def create_database(prefix, encoding):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return AsyncDatabase(engine=MagicMock(), server=server)
+
+        with patch.object(server, "create_database", side_effect=create_database):
+            databases = await server.create_databases(6, concurrency=2)
+
+        assert len(databases) == 6
+        assert peak == 2
+
+    @pytest.mark.asyncio
+    async def test_drops_created_databases_on_error(self, mock_async_engine):
+        """Test the databases that were created are dropped if another one fails."""
+        server = AsyncDatabaseServer(engine=mock_async_engine)
+        database = AsyncDatabase(engine=MagicMock(), server=server)
+        with (
+            patch.object(
+                server,
+                "create_database",
+                AsyncMock(side_effect=[database, RuntimeError("boom")]),
+            ),
+            patch.object(AsyncDatabase, "drop", AsyncMock()) as mock_drop,
+            pytest.raises(ExceptionGroup) as info,
+        ):
+            await server.create_databases(2)
+
+        mock_drop.assert_awaited_once()
+        assert info.group_contains(RuntimeError, match="boom")
+
+    @pytest.mark.asyncio
+    async def test_drops_created_databases_when_cancelled(self, mock_async_engine):
+        """Test cancelling the call drops what was created so far and cancels the rest."""
+        server = AsyncDatabaseServer(engine=mock_async_engine)
+        database = AsyncDatabase(engine=MagicMock(), server=server)
+        started = asyncio.Event()
+        pending = []
+
+        async def create_database(prefix, encoding):
+            if not started.is_set():
+                started.set()
+                return database
+            pending.append(asyncio.current_task())
+            await asyncio.sleep(10)
+
+        with (
+            patch.object(server, "create_database", side_effect=create_database),
+            patch.object(AsyncDatabase, "drop", AsyncMock()) as mock_drop,
+        ):
+            task = asyncio.create_task(server.create_databases(2))
+            await started.wait()
+            await asyncio.sleep(0)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        mock_drop.assert_awaited_once()
+        assert pending
+        assert all(sibling.cancelled() for sibling in pending)
+
+
 class TestPrepareAsyncDatabase:
     """Tests for the _prepare_async_database function."""
 
@@ -371,3 +992,27 @@ class TestPrepareAsyncDatabase:
         call_args = mock_connection.execute.call_args[0][0]
         assert "WITH TEMPLATE" in str(call_args)
         assert "my_template" in str(call_args)
+
+    @pytest.mark.asyncio
+    @patch("elefast.asyncio.create_async_engine")
+    async def test_prepare_database_through_asyncpg(
+        self, mock_create_engine, mock_async_engine
+    ):
+        """Test the statement is sent directly through asyncpg when requested."""
+        mock_async_engine.dialect = MagicMock(driver="asyncpg")
+        mock_connection = MagicMock()
+        raw_connection = MagicMock()
+        raw_connection.driver_connection.execute = AsyncMock()
+        mock_connection.get_raw_connection = AsyncMock(return_value=raw_connection)
+        mock_async_engine.connect.return_value.__aenter__ = AsyncMock(
+            return_value=mock_connection
+        )
+        mock_async_engine.connect.return_value.__aexit__ = AsyncMock(return_value=False)
+
+        await _prepare_async_database(
+            mock_async_engine, prefix="test", template="tpl", native=True
+        )
+
+        mock_async_engine.begin.assert_not_called()
+        statement = raw_connection.driver_connection.execute.await_args[0][0]
+        assert 'WITH TEMPLATE "tpl"' in statement
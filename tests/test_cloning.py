@@ -0,0 +1,52 @@
+"""Tests for the elefast.cloning module."""
+
+from sqlalchemy.exc import DBAPIError
+
+from elefast.cloning import FileCopyClone, TemplateClone, WalLogClone, template_in_use
+
+
+class TestCloneStrategies:
+    """Tests for the built-in clone strategies."""
+
+    def test_template_clone(self):
+        """Test that the default strategy lets Postgres decide."""
+        statement = TemplateClone().create_database_statement("db", "template", "utf8")
+        assert statement == (
+            'CREATE DATABASE "db" WITH TEMPLATE "template" ENCODING \'utf8\''
+        )
+
+    def test_wal_log_clone(self):
+        """Test that WalLogClone requests the WAL_LOG strategy."""
+        statement = WalLogClone().create_database_statement("db", "template", "utf8")
+        assert 'WITH TEMPLATE "template"' in statement
+        assert statement.endswith(" STRATEGY WAL_LOG")
+
+    def test_file_copy_clone(self):
+        """Test that FileCopyClone requests the FILE_COPY strategy."""
+        statement = FileCopyClone().create_database_statement("db", "template", "utf8")
+        assert 'WITH TEMPLATE "template"' in statement
+        assert statement.endswith(" STRATEGY FILE_COPY")
+
+
+class _ObjectInUse(Exception):
+    sqlstate = "55006"
+
+
+class TestTemplateInUse:
+    """Tests for detecting templates that are busy."""
+
+    def test_detects_sqlstate(self):
+        """Test that the object_in_use error code is recognized."""
+        error = DBAPIError("CREATE DATABASE", None, _ObjectInUse("busy"))
+        assert template_in_use(error)
+
+    def test_detects_message(self):
+        """Test that drivers without error codes are supported as well."""
+        message = 'source database "template" is being accessed by other users'
+        error = DBAPIError("CREATE DATABASE", None, Exception(message))
+        assert template_in_use(error)
+
+    def test_ignores_other_errors(self):
+        """Test that unrelated errors are not mistaken for a busy template."""
+        error = DBAPIError("CREATE DATABASE", None, Exception("permission denied"))
+        assert not template_in_use(error)
@@ -0,0 +1,93 @@
+"""Tests for the elefast.engines module."""
+
+from unittest.mock import patch
+
+from sqlalchemy import column, create_engine, event, select, table, text
+
+from elefast.engines import derive_engine
+
+
+class TestDeriveEngine:
+    """Tests for derive_engine()."""
+
+    def test_connects_to_other_database(self, tmp_path):
+        """Test the derived engine uses its own database."""
+        prototype = create_engine(f"sqlite:///{tmp_path / 'prototype.db'}")
+        engine = derive_engine(prototype, str(tmp_path / "clone.db"))
+
+        with engine.begin() as connection:
+            connection.execute(text("CREATE TABLE t (x INTEGER)"))
+        engine.dispose()
+
+        assert engine.url.database == str(tmp_path / "clone.db")
+        assert (tmp_path / "clone.db").exists()
+        assert not (tmp_path / "prototype.db").exists()
+
+    def test_shares_dialect_and_compiled_cache(self, tmp_path):
+        """Test statements compiled for one database are reused for the others."""
+        prototype = create_engine(f"sqlite:///{tmp_path / 'prototype.db'}")
+        query = select(table("t", column("x")))
+
+        for name in ["first.db", "second.db"]:
+            engine = derive_engine(prototype, str(tmp_path / name))
+            with engine.begin() as connection:
+                connection.execute(text("CREATE TABLE t (x INTEGER)"))
+                connection.execute(query)
+            engine.dispose()
+            assert engine.dialect is prototype.dialect
+            assert engine._compiled_cache is prototype._compiled_cache
+
+        assert prototype._compiled_cache is not None
+        assert len(prototype._compiled_cache) == 2
+
+    def test_initializes_dialect_once(self, tmp_path):
+        """Test only the first derived engine runs the dialect initialization."""
+        prototype = create_engine(f"sqlite:///{tmp_path / 'prototype.db'}")
+        dialect_class = type(prototype.dialect)
+
+        with patch.object(
+            dialect_class, "initialize", autospec=True, wraps=dialect_class.initialize
+        ) as mock_initialize:
+            for name in ["first.db", "second.db"]:
+                engine = derive_engine(prototype, str(tmp_path / name))
+                with engine.connect() as connection:
+                    connection.execute(text("SELECT 1"))
+                engine.dispose()
+
+        mock_initialize.assert_called_once()
+
+    def test_keeps_engine_options(self, tmp_path):
+        """Test pool settings and execution options of the prototype carry over."""
+        prototype = create_engine(
+            f"sqlite:///{tmp_path / 'prototype.db'}",
+            pool_size=2,
+            max_overflow=3,
+            execution_options={"isolation_level": "SERIALIZABLE"},
+        )
+        engine = derive_engine(prototype, str(tmp_path / "clone.db"))
+
+        assert engine.pool.size() == 2
+        assert engine.pool._max_overflow == 3
+        assert engine.get_execution_options()["isolation_level"] == "SERIALIZABLE"
+
+    def test_keeps_connect_args_and_do_connect_listeners(self, tmp_path):
+        """Test the derived engine connects with the arguments the prototype was created with."""
+        prototype = create_engine(
+            f"sqlite:///{tmp_path / 'prototype.db'}", connect_args={"timeout": 7}
+        )
+        listened = []
+        event.listen(prototype, "do_connect", lambda *args: listened.append(args))
+
+        engine = derive_engine(prototype, str(tmp_path / "clone.db"))
+        with (
+            patch.object(
+                prototype.dialect, "connect", wraps=prototype.dialect.connect
+            ) as mock_connect,
+            engine.connect() as connection,
+        ):
+            connection.execute(text("SELECT 1"))
+        engine.dispose()
+
+        assert len(listened) == 1
+        assert mock_connect.call_args[0] == (str(tmp_path / "clone.db"),)
+        assert mock_connect.call_args[1]["timeout"] == 7
@@ -4,6 +4,7 @@ from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import psycopg2
 
 from elefast import AsyncDatabase, AsyncDatabaseServer, Database, DatabaseServer
 from elefast.extras.docker.configuration import Configuration, Credentials
@@ -84,6 +85,7 @@ class TestDatabaseWorkflowSync:
         mock_prepare.side_effect = [mock_template_engine, mock_db_engine]
 
         mock_connection = MagicMock()
+        mock_connection.dialect = psycopg2.dialect()
         mock_template_engine.begin.return_value.__enter__ = MagicMock(
             return_value=mock_connection
         )
@@ -95,8 +97,9 @@ class TestDatabaseWorkflowSync:
         _ = server.create_database(prefix="elefast")
 
         # Verify schema creation was called for 'app' schema (not 'public')
-        execute_calls = mock_connection.execute.call_args_list
-        assert len(execute_calls) > 0
+        (script,) = mock_connection.exec_driver_sql.call_args.args
+        assert "CREATE SCHEMA IF NOT EXISTS app" in script
+        assert "CREATE SCHEMA IF NOT EXISTS public" not in script
 
 
 class TestDatabaseWorkflowAsync:
@@ -0,0 +1,224 @@
+"""Tests for the elefast.reset module."""
+
+from unittest.mock import MagicMock
+
+from sqlalchemy import (
+    Column,
+    Computed,
+    ForeignKey,
+    Identity,
+    Integer,
+    MetaData,
+    Table,
+)
+from sqlalchemy.dialects import postgresql
+
+from elefast.reset import (
+    LOCK_TIMEOUT,
+    TRACKING_SCHEMA,
+    ResetPlan,
+    install_write_tracking,
+    written_tuples,
+)
+
+
+def _mock_connection() -> MagicMock:
+    connection = MagicMock()
+    connection.dialect = postgresql.dialect()
+    return connection
+
+
+class TestResetPlanApply:
+    """Tests for ResetPlan.apply()."""
+
+    def test_apply_without_tables(self):
+        """Test that nothing is executed for a template without tables."""
+        connection = _mock_connection()
+        plan = ResetPlan(tables=(), rows={}, sequences={})
+
+        plan.apply(connection)
+
+        connection.execute.assert_not_called()
+
+    def test_apply_truncates_all_tables_at_once(self, sample_metadata):
+        """Test that all tables are truncated in a single statement."""
+        connection = _mock_connection()
+        plan = ResetPlan(
+            tables=tuple(sample_metadata.sorted_tables), rows={}, sequences={}
+        )
+
+        plan.apply(connection)
+
+        statements = [str(call[0][0]) for call in connection.execute.call_args_list]
+        assert len(statements) == 2
+        assert statements[0] == f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"
+        statement = statements[1]
+        assert statement.startswith("TRUNCATE ")
+        assert "users" in statement
+        assert "posts" in statement
+        assert "RESTART IDENTITY" in statement
+
+    def test_apply_restores_rows_and_sequences(self, sample_metadata):
+        """Test that template rows are inserted again and sequences restored."""
+        connection = _mock_connection()
+        rows = [{"id": 1, "name": "Jane", "email": "jane@example.com"}]
+        plan = ResetPlan(
+            tables=tuple(sample_metadata.sorted_tables),
+            rows={"users": rows},
+            sequences={'"public"."users_id_seq"': 1},
+        )
+
+        plan.apply(connection)
+
+        calls = connection.execute.call_args_list
+        assert len(calls) == 4
+        insert, parameters = calls[2][0]
+        assert str(insert).startswith("INSERT INTO users (id, name, email)")
+        assert "OVERRIDING SYSTEM VALUE" in str(insert)
+        assert parameters == [
+            {"value_0": 1, "value_1": "Jane", "value_2": "jane@example.com"}
+        ]
+        statement, parameters = calls[3][0]
+        assert "setval(CAST(:name_0 AS regclass), :value_0)" in str(statement)
+        assert parameters == {"name_0": '"public"."users_id_seq"', "value_0": 1}
+
+    def test_apply_skips_generated_columns(self):
+        """Test that generated columns are left to the database when re-inserting rows."""
+        connection = _mock_connection()
+        metadata = MetaData()
+        Table(
+            "prices",
+            metadata,
+            Column("id", Integer, Identity(always=True), primary_key=True),
+            Column("net", Integer),
+            Column("gross", Integer, Computed("net * 2")),
+        )
+        plan = ResetPlan(
+            tables=tuple(metadata.sorted_tables),
+            rows={"prices": [{"id": 1, "net": 5, "gross": 10}]},
+            sequences={},
+        )
+
+        plan.apply(connection)
+
+        insert, parameters = connection.execute.call_args_list[2][0]
+        assert str(insert) == (
+            "INSERT INTO prices (id, net) OVERRIDING SYSTEM VALUE VALUES (:value_0, :value_1)"
+        )
+        assert parameters == [{"value_0": 1, "value_1": 5}]
+
+    def test_apply_restarts_unused_sequences(self, sample_metadata):
+        """Test that sequences no table owns are restarted, as RESTART IDENTITY misses them."""
+        connection = _mock_connection()
+        plan = ResetPlan(
+            tables=tuple(sample_metadata.sorted_tables),
+            rows={},
+            sequences={},
+            sequence_starts={'"public"."order_numbers"': 1000},
+        )
+
+        plan.apply(connection)
+
+        statement, parameters = connection.execute.call_args_list[2][0]
+        assert "setval(CAST(:name_0 AS regclass), :value_0, false)" in str(statement)
+        assert parameters == {"name_0": '"public"."order_numbers"', "value_0": 1000}
+
+    def test_apply_restores_sequences_without_tables(self):
+        """Test that a template with only standalone sequences still gets them restored."""
+        connection = _mock_connection()
+        plan = ResetPlan(tables=(), rows={}, sequences={'"public"."counter"': 5})
+
+        plan.apply(connection)
+
+        statement, parameters = connection.execute.call_args_list[-1][0]
+        assert "setval(CAST(:name_0 AS regclass), :value_0)" in str(statement)
+        assert parameters == {"name_0": '"public"."counter"', "value_0": 5}
+
+
+class TestResetPlanTracking:
+    """Tests for resetting only the tables that were written to."""
+
+    def _plan(self, **kwargs) -> ResetPlan:
+        # Reflected tables always have a schema
+        metadata = MetaData()
+        Table(
+            "users", metadata, Column("id", Integer, primary_key=True), schema="public"
+        )
+        Table(
+            "posts",
+            metadata,
+            Column("id", Integer, primary_key=True),
+            Column("user_id", ForeignKey("public.users.id")),
+            schema="public",
+        )
+        return ResetPlan(
+            tables=tuple(metadata.sorted_tables), rows={}, sequences={}, **kwargs
+        )
+
+    def test_install_creates_triggers(self):
+        """Test that the tracking table, function and triggers are created."""
+        connection = _mock_connection()
+
+        install_write_tracking(connection)
+
+        statements = [str(call[0][0]) for call in connection.execute.call_args_list]
+        assert statements[0] == f"CREATE SCHEMA IF NOT EXISTS {TRACKING_SCHEMA}"
+        assert any("CREATE TRIGGER elefast_mark_written" in s for s in statements)
+
+    def test_apply_truncates_only_written_tables(self):
+        """Test that tables nobody wrote to are left alone."""
+        connection = _mock_connection()
+        connection.execute.return_value.tuples.return_value = [("public", "posts")]
+        plan = self._plan(tracked=True)
+
+        plan.apply(connection)
+
+        statements = [str(call[0][0]) for call in connection.execute.call_args_list]
+        truncate = next(s for s in statements if s.startswith("TRUNCATE"))
+        assert "posts" in truncate
+        assert "users" not in truncate
+        assert statements[-1] == f"DELETE FROM {TRACKING_SCHEMA}.written_tables"
+
+    def test_apply_truncates_referencing_tables(self):
+        """Test that tables with foreign keys to a written table are truncated too."""
+        connection = _mock_connection()
+        connection.execute.return_value.tuples.return_value = [("public", "users")]
+        plan = self._plan(tracked=True)
+
+        plan.apply(connection)
+
+        statements = [str(call[0][0]) for call in connection.execute.call_args_list]
+        truncate = next(s for s in statements if s.startswith("TRUNCATE"))
+        assert "users" in truncate
+        assert "posts" in truncate
+
+    def test_apply_without_writes_restarts_unused_sequences(self):
+        """Test that sequences advanced by rolled back inserts are restarted."""
+        connection = _mock_connection()
+        connection.execute.return_value.tuples.return_value = []
+        plan = self._plan(
+            tracked=True,
+            sequence_starts={'"public"."users_id_seq"': 1},
+        )
+
+        plan.apply(connection)
+
+        statements = [str(call[0][0]) for call in connection.execute.call_args_list]
+        assert not any(s.startswith("TRUNCATE") for s in statements)
+        statement, parameters = connection.execute.call_args_list[2][0]
+        assert "setval(CAST(:name_0 AS regclass), :value_0, false)" in str(statement)
+        assert parameters == {"name_0": '"public"."users_id_seq"', "value_0": 1}
+
+
+class TestWrittenTuples:
+    """Tests for written_tuples()."""
+
+    def test_returns_backends_and_tuples(self):
+        """Test that the connected backends and the tuple counters are queried at once."""
+        connection = _mock_connection()
+        connection.execute.return_value.one.return_value = (0, 42)
+
+        assert written_tuples(connection, "elefast-1") == (0, 42)
+        statement, parameters = connection.execute.call_args[0]
+        assert "pg_stat_database" in str(statement)
+        assert parameters == {"name": "elefast-1"}
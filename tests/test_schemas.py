@@ -0,0 +1,84 @@
+"""Tests for the elefast.schemas module."""
+
+from unittest.mock import MagicMock
+
+from sqlalchemy import create_engine, text
+
+from elefast.schemas import (
+    pin_search_path,
+    record_statements,
+    replay_statements,
+    search_path,
+)
+
+
+class TestRecordStatements:
+    """Tests for record_statements()."""
+
+    def test_records_statements_and_parameters(self):
+        """Test that statements executed inside the block are recorded."""
+        engine = create_engine("sqlite://")
+        with engine.begin() as connection:
+            connection.execute(text("CREATE TABLE users (id INTEGER)"))
+            with record_statements(connection) as statements:
+                connection.execute(text("INSERT INTO users VALUES (:id)"), {"id": 1})
+            connection.execute(text("SELECT 1"))
+
+        assert len(statements) == 1
+        statement, parameters = statements[0]
+        assert statement.startswith("INSERT INTO users")
+        assert list(parameters) == [1]
+
+    def test_skips_catalog_queries(self):
+        """Test that catalog lookups are not recorded, but other queries are, as they might be e.g. setval()."""
+        engine = create_engine("sqlite://")
+        with engine.begin() as connection:
+            connection.execute(text("CREATE TABLE pg_class (relname TEXT)"))
+            with record_statements(connection) as statements:
+                connection.execute(text("  select relname\nfrom pg_class"))
+                connection.execute(text("CREATE TABLE users (id INTEGER)"))
+                connection.execute(text("SELECT max(id) FROM users"))
+
+        assert [statement for statement, _ in statements] == [
+            "CREATE TABLE users (id INTEGER)",
+            "SELECT max(id) FROM users",
+        ]
+
+
+class TestReplayStatements:
+    """Tests for replay_statements()."""
+
+    def test_replays_inside_new_schema(self):
+        """Test that the schema is created and used before replaying."""
+        connection = MagicMock()
+        statements = [("CREATE TABLE users (id INTEGER)", ()), ("INSERT ...", (1,))]
+
+        replay_statements(connection, "test_schema", statements)
+
+        calls = [c.args for c in connection.exec_driver_sql.call_args_list]
+        assert calls == [
+            ('CREATE SCHEMA "test_schema"',),
+            ('SET LOCAL search_path TO "test_schema", public',),
+            ("CREATE TABLE users (id INTEGER)", None),
+            ("INSERT ...", (1,)),
+        ]
+
+
+class TestPinSearchPath:
+    """Tests for pin_search_path()."""
+
+    def test_sets_search_path_for_the_session(self):
+        """Test that new connections set the schema outside of a transaction, without driver-specific attributes."""
+        engine = create_engine("sqlite://")
+        pin_search_path(engine, "test_schema")
+        dbapi_connection = MagicMock(spec=["cursor", "commit"])
+
+        # The dialect registers its own listener first
+        *_, listener = engine.pool.dispatch.connect
+        listener(dbapi_connection, MagicMock())
+
+        cursor = dbapi_connection.cursor.return_value
+        cursor.execute.assert_called_once_with(
+            f"SET search_path TO {search_path('test_schema')}"
+        )
+        dbapi_connection.commit.assert_called_once()
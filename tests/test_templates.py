@@ -0,0 +1,276 @@
+"""Tests for the elefast.templates module."""
+
+from unittest.mock import MagicMock, patch
+
+from sqlalchemy import (
+    DDL,
+    Column,
+    Enum,
+    Integer,
+    MetaData,
+    Table,
+    create_engine,
+    event,
+    text,
+)
+from sqlalchemy.dialects.postgresql import asyncpg, psycopg2
+
+from elefast.extras.alembic import AlembicMigrator
+from elefast.sync import MetadataMigrator
+from elefast.templates import (
+    Fingerprinted,
+    execute_script,
+    metadata_ddl,
+    metadata_fingerprint,
+    metadata_script,
+    revision_comment_statement,
+    template_name,
+    upgradable_template,
+    xdist_template_name,
+    xdist_worker_index,
+)
+
+REVISION = """
+revision = "{revision}"
+down_revision = {down_revision}
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    pass
+
+
+def downgrade():
+    pass
+"""
+
+
+class TestTemplateName:
+    """Tests for template_name()."""
+
+    def test_name_is_stable(self):
+        """Test that the same fingerprint always results in the same name."""
+        assert template_name("abc", "utf8") == template_name("abc", "utf8")
+
+    def test_name_depends_on_encoding(self):
+        """Test that templates with different encodings are not mixed up."""
+        assert template_name("abc", "utf8") != template_name("abc", "latin1")
+
+    def test_name_fits_into_postgres_identifiers(self):
+        """Test that the name is not truncated by Postgres."""
+        assert len(template_name("abc" * 100, "utf8")) <= 63
+
+    def test_xdist_name_is_shared_within_a_run(self, monkeypatch):
+        """Test that all workers of a run agree on the name, but other runs don't."""
+        monkeypatch.setenv("PYTEST_XDIST_TESTRUNUID", "run-1")
+        first = xdist_template_name("abc", "utf8")
+        assert first == xdist_template_name("abc", "utf8")
+        monkeypatch.setenv("PYTEST_XDIST_TESTRUNUID", "run-2")
+        assert xdist_template_name("abc", "utf8") != first
+
+    def test_no_xdist_name_outside_of_xdist(self, monkeypatch):
+        """Test that there is nothing to share when not running under xdist."""
+        monkeypatch.delenv("PYTEST_XDIST_TESTRUNUID", raising=False)
+        assert xdist_template_name("abc", "utf8") is None
+
+    def test_xdist_worker_index(self, monkeypatch):
+        """Test that workers are numbered after their id, and everything else is the first one."""
+        monkeypatch.setenv("PYTEST_XDIST_WORKER", "gw3")
+        assert xdist_worker_index() == 3
+        monkeypatch.delenv("PYTEST_XDIST_WORKER")
+        assert xdist_worker_index() == 0
+
+
+class TestMetadataFingerprint:
+    """Tests for fingerprints of sqlalchemy.MetaData."""
+
+    def test_ddl_contains_tables(self, sample_metadata):
+        """Test that the DDL creates all tables."""
+        ddl = metadata_ddl(sample_metadata)
+        assert any(statement.startswith("CREATE TABLE users") for statement in ddl)
+        assert any(statement.startswith("CREATE TABLE posts") for statement in ddl)
+
+    def test_fingerprint_is_stable(self, sample_metadata):
+        """Test that the fingerprint does not change for the same schema."""
+        assert metadata_fingerprint(sample_metadata) == metadata_fingerprint(
+            sample_metadata
+        )
+
+    def test_fingerprint_changes_with_schema(self, sample_metadata):
+        """Test that adding a table changes the fingerprint."""
+        before = metadata_fingerprint(sample_metadata)
+        Table("comments", sample_metadata, Column("id", Integer, primary_key=True))
+        assert metadata_fingerprint(sample_metadata) != before
+
+    def test_metadata_migrator_is_fingerprinted(self):
+        """Test that the MetadataMigrator supports persistent templates."""
+        assert isinstance(MetadataMigrator(MetaData()), Fingerprinted)
+
+
+class TestMetadataScript:
+    """Tests for creating the schema of sqlalchemy.MetaData from compiled DDL."""
+
+    def test_script_creates_schemas_first(self, sample_metadata_with_schema):
+        """Test that non-public schemas are created before the tables."""
+        script = metadata_script(sample_metadata_with_schema, psycopg2.dialect())
+        assert script[0] == "CREATE SCHEMA IF NOT EXISTS app"
+        assert all(not statement.startswith("DROP") for statement in script)
+
+    def test_single_round_trip_for_psycopg(self, sample_metadata):
+        """Test that psycopg sends all statements at once."""
+        connection = MagicMock()
+        connection.dialect = psycopg2.dialect()
+        script = metadata_script(sample_metadata, connection.dialect)
+        execute_script(connection, script)
+        connection.exec_driver_sql.assert_called_once_with(";\n".join(script))
+
+    def test_statement_by_statement_for_asyncpg(self, sample_metadata):
+        """Test that asyncpg, which prepares every statement, gets them one by one."""
+        connection = MagicMock()
+        connection.dialect = asyncpg.dialect()
+        script = metadata_script(sample_metadata, connection.dialect)
+        execute_script(connection, script)
+        assert connection.exec_driver_sql.call_count == len(script)
+
+    def test_migrator_caches_script(self, sample_metadata):
+        """Test that the DDL is only compiled once per driver."""
+        migrator = MetadataMigrator(sample_metadata)
+        connection = MagicMock()
+        connection.dialect = psycopg2.dialect()
+        with patch(
+            "elefast.templates.metadata_script", wraps=metadata_script
+        ) as mock_script:
+            migrator.migrate(connection)
+            migrator.migrate(connection)
+        mock_script.assert_called_once()
+        assert connection.exec_driver_sql.call_count == 2
+
+    def test_migrator_does_not_check_for_existing_tables(self, sample_metadata):
+        """Test that migrating a fresh database does not look up every table first."""
+        connection = MagicMock()
+        connection.dialect = psycopg2.dialect()
+
+        with patch.object(sample_metadata, "drop_all") as mock_drop_all:
+            MetadataMigrator(sample_metadata).migrate(connection)
+
+        mock_drop_all.assert_not_called()
+        connection.exec_driver_sql.assert_called_once()
+
+    def test_migrator_can_drop_existing_tables(self, sample_metadata):
+        """Test that migrating a database that already has the tables replaces them if asked to."""
+        engine = create_engine("sqlite://")
+        with engine.begin() as connection:
+            sample_metadata.create_all(connection)
+            connection.execute(text("INSERT INTO users (id) VALUES (1)"))
+            MetadataMigrator(sample_metadata, drop_existing=True).migrate(connection)
+            count = connection.execute(text("SELECT count(*) FROM users"))
+            assert count.scalar_one() == 0
+
+    def test_listeners_needing_a_connection_use_create_all(self, sample_metadata):
+        """Test that after_create functions run against the real connection."""
+        calls = []
+
+        @event.listens_for(sample_metadata, "after_create")
+        def seed(target, connection, **kwargs):
+            calls.append(connection)
+            connection.exec_driver_sql("INSERT INTO users (id) VALUES (1)")
+
+        engine = create_engine("sqlite://")
+        with engine.begin() as connection:
+            MetadataMigrator(sample_metadata).migrate(connection)
+            count = connection.execute(text("SELECT count(*) FROM users"))
+            assert count.scalar_one() == 1
+        assert calls == [connection]
+
+    def test_ddl_listeners_are_compiled(self, sample_metadata):
+        """Test that DDL listeners and ENUM types do not prevent compiling the script."""
+        Table(
+            "moods",
+            sample_metadata,
+            Column("mood", Enum("happy", "sad", name="mood")),
+        )
+        event.listen(
+            sample_metadata.tables["users"],
+            "after_create",
+            DDL("COMMENT ON TABLE users IS 'people'"),
+        )
+        connection = MagicMock()
+        connection.dialect = psycopg2.dialect()
+
+        MetadataMigrator(sample_metadata).migrate(connection)
+
+        script = connection.exec_driver_sql.call_args[0][0]
+        assert "CREATE TYPE mood" in script
+        assert "COMMENT ON TABLE users IS 'people'" in script
+
+
+class TestAlembicFingerprint:
+    """Tests for fingerprints of Alembic migrations."""
+
+    def _write_project(self, tmp_path):
+        (tmp_path / "migrations" / "versions").mkdir(parents=True)
+        (tmp_path / "migrations" / "env.py").write_text("")
+        (tmp_path / "alembic.ini").write_text(
+            "[alembic]\nscript_location = %(here)s/migrations\n"
+        )
+        self._add_revision(tmp_path, "aaa", None)
+        return AlembicMigrator(tmp_path / "alembic.ini")
+
+    def _add_revision(self, tmp_path, revision, down_revision):
+        (tmp_path / "migrations" / "versions" / f"{revision}.py").write_text(
+            REVISION.format(revision=revision, down_revision=repr(down_revision))
+        )
+
+    def test_fingerprint_is_stable(self, tmp_path):
+        """Test that the fingerprint does not change without new migrations."""
+        migrator = self._write_project(tmp_path)
+        assert migrator.fingerprint() == migrator.fingerprint()
+
+    def test_fingerprint_changes_with_new_revision(self, tmp_path):
+        """Test that adding a migration changes the fingerprint."""
+        migrator = self._write_project(tmp_path)
+        before = migrator.fingerprint()
+        self._add_revision(tmp_path, "bbb", "aaa")
+        assert migrator.fingerprint() != before
+
+    def test_fingerprint_at_older_revision(self, tmp_path):
+        """Test that the fingerprint of an older revision can still be computed."""
+        migrator = self._write_project(tmp_path)
+        before = migrator.fingerprint()
+        self._add_revision(tmp_path, "bbb", "aaa")
+        assert migrator.revision() == "bbb"
+        assert migrator.fingerprint_at("aaa") == before
+
+    def test_fingerprint_at_unknown_revision(self, tmp_path):
+        """Test that revisions which no longer exist have no fingerprint."""
+        migrator = self._write_project(tmp_path)
+        assert migrator.fingerprint_at("zzz") is None
+
+    def test_finds_upgradable_template(self, tmp_path):
+        """Test that a template built for an older revision is found."""
+        migrator = self._write_project(tmp_path)
+        old_template = template_name(migrator.fingerprint(), "utf8")
+        self._add_revision(tmp_path, "bbb", "aaa")
+        candidates = [
+            (template_name("other", "utf8"), None),
+            (template_name("edited", "utf8"), "elefast revision aaa"),
+            (old_template, "elefast revision aaa"),
+        ]
+        assert upgradable_template(migrator, "utf8", candidates) == old_template
+
+    def test_ignores_templates_with_other_encoding(self, tmp_path):
+        """Test that templates with another encoding are not upgraded."""
+        migrator = self._write_project(tmp_path)
+        old_template = template_name(migrator.fingerprint(), "latin1")
+        candidates = [(old_template, "elefast revision aaa")]
+        assert upgradable_template(migrator, "utf8", candidates) is None
+
+
+class TestRevisionCommentStatement:
+    """Tests for revision_comment_statement()."""
+
+    def test_escapes_quotes(self):
+        """Test that the revision can not break out of the string literal."""
+        statement = revision_comment_statement("db", "it's")
+        assert statement == "COMMENT ON DATABASE \"db\" IS 'elefast revision it''s'"